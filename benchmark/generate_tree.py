@@ -0,0 +1,100 @@
+import json
+import os
+import random
+
+from src.utils import nodes_to_list
+from src.utils.utils_config import ReporterConfig, load_json
+from src.utils.utils_index import FileClassifier, RESULT_FILE, MODEL_CONFIG_FILE
+
+SETS = ['train', 'val', 'test']
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'config',
+                                   'config.json')
+
+
+def generate_config_nodes(depth):
+    """Returns a chain of config nodes of the given depth in the format of config_data, e.g. depth 2:
+    {"benchmark": {"node_1": ["value"]}}"""
+    nodes = ['value']
+    for level in range(depth - 1, 0, -1):
+        nodes = {'node_{}'.format(level): nodes}
+    return {'benchmark': nodes}
+
+
+def set_nodes(data, nodes, value):
+    """Sets the value at the nodes, missing nodes are created."""
+    for node in nodes[:-1]:
+        data = data.setdefault(node, dict())
+    data[nodes[-1]] = value
+
+
+def generate_model_config(node_list, model_idx, rng):
+    """Generates a model config which contains every node of the node list."""
+    model_config = dict()
+    for nodes in node_list:
+        set_nodes(model_config, nodes, '{}_{}'.format('_'.join(nodes), rng.randint(0, 3)))
+    set_nodes(model_config, ['name'], 'model{}'.format(model_idx))
+    return model_config
+
+
+def write_result_file(path, first_column, rows, columns, rng):
+    with open(path, 'w') as result_file:
+        result_file.write(','.join([first_column, *columns]) + '\n')
+        for row in rows:
+            result_file.write(','.join([row, *['{:.6f}'.format(rng.random()) for _ in columns]]) + '\n')
+
+
+def generate_session(root, models=10, runs=5, classes=10, metrics=5, config_depth=3, config_path=None, seed=0):
+    """Generates a synthetic session in root with the file names of the config.
+    Returns the path of the session and the path of the reporter config for the session."""
+    if config_path is None:
+        config_path = DEFAULT_CONFIG_PATH
+
+    rng = random.Random(seed)
+
+    # reporter config with additional config nodes of the given depth
+    config_data = json.loads(json.dumps(load_json(config_path)))
+    if config_depth > 0:
+        config_data['config_data'].append(generate_config_nodes(config_depth))
+    os.makedirs(root, exist_ok=True)
+    reporter_config_path = os.path.join(root, 'config.json')
+    with open(reporter_config_path, 'w') as config_file:
+        json.dump(config_data, config_file, indent=2)
+
+    config = ReporterConfig(reporter_config_path)
+    classifier = FileClassifier(config)
+    node_list = nodes_to_list(config.get('config_data'))
+
+    # file names, checked against the patterns of the config
+    run_directories = ['run{}'.format(run) for run in range(1, runs + 1)]
+    result_file_names = ['{}_testresults.csv'.format(set_name) for set_name in SETS]
+    model_directory, model_config_name = 'model', 'config.json'
+    names_of_kind = [(RESULT_FILE, file_name) for file_name in [*result_file_names, 'metrics.csv']]
+    names_of_kind.append((MODEL_CONFIG_FILE, model_config_name))
+    for kind, file_name in names_of_kind:
+        if classifier.classify(file_name) != kind:
+            raise ValueError(f"'{file_name}' does not match the {kind} pattern of the config.")
+    if not all(config.get_pattern('run_directory').match(run_directory) for run_directory in run_directories) or \
+            not config.get_pattern('model_directory').match(model_directory):
+        raise ValueError("The directory names do not match the directory patterns of the config.")
+
+    class_names = ['class{}'.format(clazz) for clazz in range(classes)]
+    class_names.extend(config.get('drop')[:1])
+    metric_names = ['metric{}'.format(metric) for metric in range(metrics)]
+    class_column = config.get('class_column_name')
+
+    session_path = os.path.join(root, 'session')
+    for model_idx in range(models):
+        model_path = os.path.join(session_path, 'model{}'.format(model_idx))
+        os.makedirs(os.path.join(model_path, model_directory), exist_ok=True)
+        with open(os.path.join(model_path, model_directory, model_config_name), 'w') as model_config_file:
+            json.dump(generate_model_config(node_list, model_idx, rng), model_config_file)
+
+        for run_directory in run_directories:
+            run_path = os.path.join(model_path, run_directory)
+            os.makedirs(run_path, exist_ok=True)
+            for file_name in result_file_names:
+                write_result_file(os.path.join(run_path, file_name), class_column, class_names, metric_names, rng)
+            write_result_file(os.path.join(run_path, 'metrics.csv'), 'Name', SETS[:2], ['loss', 'accuracy'], rng)
+
+    return session_path, reporter_config_path
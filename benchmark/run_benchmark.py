@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.MetaReporter import MetaReporter
+from src.utils.utils_index import scan_model
+from src.utils.utils_pandas import generate_dataframes_with_run, calculate, get_dataframes_per_file_for_table_plot
+from src.visualization.BarPlotter import BarPlotter
+from src.visualization.TablePlotter import TablePlotter
+from src.visualization.ViolinPlotter import ViolinPlotter
+from .generate_tree import generate_session
+
+
+def measure(function, repeat=3, setup=None):
+    """Returns the wall times of repeat calls and the peak memory of one additional traced call.
+    setup is called before each call and is not measured."""
+    seconds = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    # tracing slows the call down, so memory is measured separately
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': seconds, 'best_seconds': min(seconds), 'peak_memory_bytes': peak}
+
+
+# modules, which must not be loaded by importing the reporter
+LAZY_MODULES = ['plotly', 'colour', 'icecream']
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [name for name in {lazy_modules} if name in sys.modules]}}))
+"""
+
+
+def measure_import_time(module='src', repeat=5):
+    """Returns the import times of the module, each measured in a new interpreter, and the lazy modules loaded by
+    the import."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = IMPORT_SCRIPT.format(module=module, lazy_modules=LAZY_MODULES)
+    seconds = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], cwd=root, check=True, capture_output=True,
+                                text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        seconds.append(result['seconds'])
+        loaded.update(result['loaded'])
+    return {'module': module, 'seconds': seconds, 'best_seconds': min(seconds), 'loaded_lazy_modules': sorted(loaded)}
+
+
+def check_import_budget(import_result, budget):
+    """Returns the violations of the import time budget in seconds, empty if there are none."""
+    violations = []
+    if budget is not None and import_result['best_seconds'] > budget:
+        violations.append("importing {} took {:.3f}s, the budget is {:.3f}s".format(
+            import_result['module'], import_result['best_seconds'], budget))
+    if len(import_result['loaded_lazy_modules']) > 0:
+        violations.append("importing {} loaded {}".format(import_result['module'],
+                                                          ', '.join(import_result['loaded_lazy_modules'])))
+    return violations
+
+
+def reset_directory(path):
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def run_benchmarks(root, models=10, runs=5, classes=10, metrics=5, config_depth=3, repeat=3, workers=1,
+                   plot_format=None):
+    """Generates a synthetic session in root and measures the stages of the reporter.
+    Plots are only exported if plot_format is given."""
+    session_path, config_path = generate_session(root, models=models, runs=runs, classes=classes, metrics=metrics,
+                                                 config_depth=config_depth)
+    result_path = os.path.join(root, 'results')
+    reset_directory(result_path)
+
+    reporter = MetaReporter(session_path, result_path, config_path=config_path, level=None, workers=workers,
+                            incremental=False)
+    model_path = os.path.join(session_path, 'model0')
+
+    # data of the first file of the first model for the plotters
+    group_column = reporter.config.get('class_column_name')
+    paths_per_run_of_file = scan_model(model_path, reporter.config).get_paths_per_run_of_name()
+    file_name = next(iter(paths_per_run_of_file))
+    dataframes_per_file = generate_dataframes_with_run({file_name: paths_per_run_of_file[file_name]}, group_column,
+                                                       reporter.drop_rows)
+    calculated_dfs_per_file = calculate(dataframes_per_file, group_by=group_column, metrics=reporter.model_metrics,
+                                        drop_columns=['Run'])
+    table_df = get_dataframes_per_file_for_table_plot(dataframes_per_file, calculated_dfs_per_file)[file_name]
+    violin_df = dataframes_per_file[file_name].reset_index(drop=False).drop(columns=['Run'])
+    bar_df = calculated_dfs_per_file[file_name]
+    plot_path = os.path.join(root, 'plots')
+    reset_directory(plot_path)
+
+    def plot(plotter_class, **kwargs):
+        plotter = plotter_class(result_path=plot_path, file_name=plotter_class.__name__, title=file_name, **kwargs)
+        if plot_format is not None:
+            plotter.save_as(plot_format)
+
+    stages = {
+        'generate_per_model': (lambda: reporter.generate_per_model(model_path, generate_plots=False), None),
+        'generate_collection_of_session': (reporter.generate_collection_of_session, None),
+        'generate_per_session': (reporter.generate_per_session, lambda: reset_directory(result_path)),
+        'BarPlotter': (lambda: plot(BarPlotter, dataframe=bar_df,
+                                    column_identifiers=reporter.config.get('bar_plot_columns')), None),
+        'ViolinPlotter': (lambda: plot(ViolinPlotter, dataframe=violin_df), None),
+        'TablePlotter': (lambda: plot(TablePlotter, dataframe=table_df.reset_index(drop=False)), None),
+    }
+
+    results = []
+    for stage, (function, setup) in stages.items():
+        result = {'stage': stage}
+        result.update(measure(function, repeat=repeat, setup=setup))
+        results.append(result)
+
+    return {
+        'parameters': {'models': models, 'runs': runs, 'classes': classes, 'metrics': metrics,
+                       'config_depth': config_depth, 'repeat': repeat, 'workers': workers,
+                       'plot_format': plot_format},
+        'environment': {'python': platform.python_version(), 'pandas': pd.__version__,
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the MetaReporter on a synthetic session.")
+    parser.add_argument('--models', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=5, help="runs per model")
+    parser.add_argument('--classes', type=int, default=10)
+    parser.add_argument('--metrics', type=int, default=5, help="metric columns per result file")
+    parser.add_argument('--config-depth', type=int, default=3, help="depth of the additional config nodes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--plot-format', default=None, help="exports the plots in this format if given")
+    parser.add_argument('--root', default=None, help="directory of the synthetic session, temporary if not given")
+    parser.add_argument('--output', default=None, help="json file of the results, printed if not given")
+    parser.add_argument('--import-budget', type=float, default=None,
+                        help="fails if importing the reporter takes longer than this many seconds")
+    parser.add_argument('--import-only', action='store_true', help="only measures the import time")
+    args = parser.parse_args()
+
+    import_result = measure_import_time(repeat=args.repeat)
+    violations = check_import_budget(import_result, args.import_budget)
+    if args.import_only:
+        print(json.dumps({'import': import_result, 'violations': violations}, indent=2))
+        sys.exit(1 if len(violations) > 0 else 0)
+
+    root = args.root if args.root is not None else tempfile.mkdtemp(prefix='meta_reporter_benchmark_')
+    try:
+        report = run_benchmarks(root, models=args.models, runs=args.runs, classes=args.classes,
+                                metrics=args.metrics, config_depth=args.config_depth, repeat=args.repeat,
+                                workers=args.workers, plot_format=args.plot_format)
+    finally:
+        if args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report['import'] = import_result
+    report['violations'] = violations
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if len(violations) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
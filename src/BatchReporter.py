@@ -0,0 +1,196 @@
+import hashlib
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .MetaReporter import MetaReporter
+from .utils.utils_config import load_config
+from .utils.utils_files import get_file_stat
+from .utils.utils_index import scan_session
+from .utils.utils_manifest import hash_settings
+from .utils.utils_queue import JobQueue, DONE, FAILED, PENDING
+
+COLLECT = 'collect'
+AGGREGATE = 'aggregate'
+SUMMARY = 'summary'
+PLOTS = 'plots'
+
+# jobs of the same session priority run in this order, plots come last
+KIND_PRIORITIES = {AGGREGATE: 3, COLLECT: 2, SUMMARY: 1, PLOTS: 0}
+
+
+def run_job(job, config_path):
+    """Runs the job, used in the worker processes."""
+    kind = job['kind']
+    reporter = MetaReporter(job['session'], job['result_path'], config_path=config_path, level=None, workers=1,
+                            incremental=False)
+    if kind == COLLECT:
+        reporter.generate_collection_of_session()
+    elif kind == AGGREGATE:
+        # the meta files are written into the model directory, the ones of archives into the result path
+        reporter.generate_per_model(job['model'], generate_plots=False, write_meta=True)
+    elif kind == PLOTS:
+        # plots of a model are built from the meta files of its aggregate job and written into the directory of the
+        # model in the result path
+        reporter.generate_plots_of_model(scan_session(job['session'], reporter.config)[job['model']])
+        reporter.close()
+    elif kind == SUMMARY:
+        # the meta files were written by the aggregate jobs
+        session_index = scan_session(job['session'], reporter.config)
+        reporter.write_session_summary([reporter.generate_summary_of_model(model_index, from_meta_files=True)[0]
+                                        for model_index in session_index.values()])
+    else:
+        raise ValueError(f"'{kind}' is not specified as job kind.")
+    return job['id']
+
+
+class BatchReporter:
+    """
+    Generates the reports of many sessions on a local process pool.
+    Each session is split into jobs: collect, aggregate per model, summary (after all aggregates) and optionally plots
+    per model (after its aggregate). Jobs are scheduled by the priority of their session, then by their kind.
+    Failed jobs are retried, jobs depending on a failed job fail as well.
+    The jobs are claimed through lock files in the queue directory, hosts sharing the directory work on the same
+    batch. Jobs are identified by the fingerprint (path, mtime and size) of their input files and the config, a later
+    batch in the same queue directory runs the jobs whose inputs changed, e.g. by a new run, finished jobs with the
+    same inputs are not run again.
+    """
+
+    def __init__(self, session_paths, result_paths=None, config_path=None, plots=None, priorities=None, workers=None,
+                 retries=None, queue_path=None):
+        self.session_paths = list(session_paths)
+        self.result_paths = list(result_paths) if result_paths is not None else self.session_paths
+        if len(self.result_paths) != len(self.session_paths):
+            raise ValueError("There has to be one result path per session.")
+
+        self.config_path = config_path
+        self.config = load_config(config_path)
+
+        self.plots = plots if plots is not None else self.config.get("batch", "plots", default=False)
+        # {session_path: priority}, higher priorities run first
+        self.priorities = priorities if priorities is not None else dict()
+
+        if workers is None:
+            workers = self.config.get("batch", "workers", default=0)
+        self.workers = workers if workers > 0 else os.cpu_count()
+        self.retries = retries if retries is not None else self.config.get("batch", "retries", default=2)
+        self.poll_interval = self.config.get("batch", "poll_interval", default=0.5)
+
+        if queue_path is None:
+            queue_path = self.config.get("batch", "queue_directory", default=None)
+        if queue_path is None:
+            queue_path = tempfile.mkdtemp(prefix='meta_batch_')
+        self.queue = JobQueue(queue_path, lock_timeout=self.config.get("batch", "lock_timeout", default=600))
+
+        # {job_id: job}
+        self.jobs = self.build_jobs()
+
+    def __str__(self):
+        return "BatchReporter(sessions: {} | jobs: {} | workers: {} | queue: {})".format(
+            len(self.session_paths), len(self.jobs), self.workers, self.queue.directory)
+
+    def get_inputs_hash(self, paths):
+        """Returns the hash of the config and the paths, mtimes and sizes of the input files."""
+        return hash_settings([self.config.data, self.plots,
+                              [[path, *get_file_stat(path)] for path in sorted(paths)]])
+
+    def build_jobs(self):
+        """Returns the job graph in the form of {job_id: job}"""
+        jobs = dict()
+
+        def add_job(kind, session_path, result_path, inputs, model_path=None, depends_on=()):
+            key = '|'.join([kind, os.path.abspath(session_path), os.path.abspath(result_path), str(model_path),
+                            inputs])
+            job_id = '_'.join([kind, hashlib.blake2b(key.encode(), digest_size=8).hexdigest()])
+            jobs[job_id] = {'id': job_id, 'kind': kind, 'session': session_path, 'result_path': result_path,
+                            'model': model_path, 'depends_on': list(depends_on),
+                            'priority': [self.priorities.get(session_path, 0), KIND_PRIORITIES[kind]],
+                            'attempts': 0}
+            return job_id
+
+        for session_path, result_path in zip(self.session_paths, self.result_paths):
+            session_index = scan_session(session_path, self.config)
+            # {model_path: [paths of the run and config files]}
+            inputs_per_model = {model_path: model_index.get_files_of_runs() + model_index.config_files
+                                for model_path, model_index in session_index.items()}
+            session_inputs = self.get_inputs_hash([path for paths in inputs_per_model.values() for path in paths])
+            add_job(COLLECT, session_path, result_path, session_inputs)
+
+            aggregate_jobs = []
+            for model_path, paths in inputs_per_model.items():
+                model_inputs = self.get_inputs_hash(paths)
+                aggregate_job = add_job(AGGREGATE, session_path, result_path, model_inputs, model_path)
+                aggregate_jobs.append(aggregate_job)
+                if self.plots:
+                    add_job(PLOTS, session_path, result_path, model_inputs, model_path, depends_on=[aggregate_job])
+
+            add_job(SUMMARY, session_path, result_path, session_inputs, depends_on=aggregate_jobs)
+        return jobs
+
+    def run(self):
+        """Runs the jobs until all of them are done or failed, also the ones run by other hosts.
+        Returns the ids of the done jobs and the errors of the failed jobs."""
+        for job in self.jobs.values():
+            self.queue.add(job)
+
+        # {future: job_id}
+        running = dict()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                states = {job_id: self.queue.get_state(job_id) for job_id in self.jobs.keys()}
+
+                # jobs depending on a failed job can not run
+                for job_id, job in self.jobs.items():
+                    if states[job_id] == PENDING and any(states[dependency] == FAILED
+                                                         for dependency in job['depends_on']):
+                        if self.queue.claim(job_id):
+                            self.queue.fail(job_id, 'A job it depends on failed.')
+                            states[job_id] = FAILED
+
+                if all(state in [DONE, FAILED] for state in states.values()):
+                    break
+
+                ready = [job for job_id, job in self.jobs.items() if states[job_id] == PENDING and
+                         all(states[dependency] == DONE for dependency in job['depends_on'])]
+                ready.sort(key=lambda job: job['priority'], reverse=True)
+                for job in ready:
+                    if len(running) >= self.workers:
+                        break
+                    if self.queue.claim(job['id']):
+                        running[executor.submit(run_job, job, self.config_path)] = job['id']
+
+                if len(running) == 0:
+                    # the remaining jobs are run by other hosts or wait for them
+                    time.sleep(self.poll_interval)
+                    continue
+
+                finished, _ = wait(running.keys(), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.finish_job(running.pop(future), future)
+
+                for job_id in running.values():
+                    self.queue.heartbeat(job_id)
+
+        done = [job_id for job_id in self.jobs.keys() if self.queue.get_state(job_id) == DONE]
+        failed = {job_id: self.queue.get_error(job_id) for job_id in self.jobs.keys()
+                  if self.queue.get_state(job_id) == FAILED}
+        return {'done': done, 'failed': failed}
+
+    def finish_job(self, job_id, future):
+        """Marks the job as done, releases it for a retry or marks it as failed after the last retry."""
+        try:
+            future.result()
+        except Exception:
+            job = self.queue.get(job_id)
+            job['attempts'] += 1
+            if job['attempts'] > self.retries:
+                self.queue.fail(job_id, traceback.format_exc())
+            else:
+                self.queue.update(job)
+                self.queue.release(job_id)
+            return False
+
+        self.queue.complete(job_id)
+        return True
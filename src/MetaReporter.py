@@ -1,18 +1,27 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import pandas as pd
 
-from .utils import nodes_to_list, check_name, get_set_name
-from .utils.utils_config import get_data_from_config, get_pattern, get_patterns_to_look_for, get_model_config_data
-from .utils.utils_files import find_files_per_pattern, remove_files_not_in_runs, get_sub_directories, \
-    get_model_config_files_per_model, get_number_of_runs, \
-    generate_file_path, get_paths_per_run_of_name, get_meta_files_per_model, get_base_name
-from .utils.utils_pandas import dataframes_to_csv, calculate, generate_dataframe_of_file_per_model, \
+from .utils import nodes_to_list, get_set_name
+from .utils.utils_aggregation import check_streaming_metrics, finalize_aggregate, flatten_aggregate
+from .utils.utils_cache import CsvCache
+from .utils.utils_catalog import ResultsCatalog
+from .utils.utils_config import load_config, get_model_config_data
+from .utils.utils_files import generate_file_path, get_base_name, split_archive_path, get_archive_name
+from .utils.utils_index import scan_model, scan_session
+from .utils.utils_instrumentation import Instrumentation, span, traced
+from .utils.utils_manifest import Manifest, hash_settings
+from .utils.utils_prefetch import Prefetcher
+from .utils.utils_pandas import dataframes_to_files, calculate, generate_dataframe_of_file_per_model, \
     write_session_meta_result, generate_summary_dataframe_of_model, generate_dataframes_with_run, \
-    get_dataframes_per_file_for_table_plot
-from .visualization.BarPlotter import BarPlotter
-from .visualization.TablePlotter import TablePlotter
-from .visualization.ViolinPlotter import ViolinPlotter
+    get_dataframes_per_file_for_table_plot, generate_long_dataframe, concat_long_dataframes, long_to_wide_dataframe, \
+    read_csv, write_dataframe, get_output_file_name, generate_aggregates_with_run, merge_partial_files, \
+    generate_long_summary_dataframe, get_file_format, sample_runs
+from .utils.utils_visualization import DEFAULT_SAMPLING_METHOD
+# the plotters are imported on first use, plotly is not needed without plots
+from .visualization.PlotExporter import PlotExporter
 
 
 class MetaReporter:
@@ -22,30 +31,116 @@ class MetaReporter:
     for generating over models with different parameters, set level to 1 and path is the path of the session.
     """
 
-    def __init__(self, path, result_path, config_path=None, metrics=None, drop_rows=None, level=1, plot_format=None):
+    def __init__(self, path, result_path, config_path=None, metrics=None, drop_rows=None, level=1, plot_format=None,
+                 workers=None, incremental=None, instrumentation=None, runs=None):
         self.path = path
         self.result_path = result_path
         self.config_path = config_path
+        self.config = load_config(config_path)
 
         if metrics is None:
-            metrics = get_data_from_config('metrics', path=self.config_path)
+            metrics = self.config.get('metrics')
         self.model_metrics = metrics['model']
         self.session_metrics = metrics['session']
 
         if drop_rows is not None:
             self.drop_rows = drop_rows
         else:
-            self.drop_rows = get_data_from_config('drop', path=self.config_path)
+            self.drop_rows = self.config.get('drop')
 
         if plot_format is not None:
             self.plot_format = plot_format
         else:
-            self.plot_format = get_data_from_config("plot_format", path=self.config_path)
-
-        if level == 0:
-            self.generate_per_model()
-        elif level == 1:
-            self.generate_per_session()
+            self.plot_format = self.config.get("plot_format")
+
+        # only the given run directories of a model are used, e.g. to shard a model over several nodes
+        self.runs = runs
+
+        # partial aggregates are written next to the meta files, the ones of several nodes are merged with
+        # merge_partial_aggregates
+        self.write_partial_files = self.config.get("partial_aggregates", "enabled", default=False)
+        if self.write_partial_files:
+            check_streaming_metrics(self.model_metrics)
+
+        # in streaming mode, the runs of a model are aggregated one at a time, memory is bounded by the size of a
+        # run and the number of runs sampled for the plots
+        self.streaming = self.config.get("streaming", "enabled", default=False)
+        self.sampled_runs = self.config.get("streaming", "sampled_runs", default=10)
+        if self.streaming:
+            check_streaming_metrics(self.model_metrics)
+
+        # format of the meta, session and collection files: csv, parquet or feather
+        self.output_format = self.config.get("output", "format", default="csv")
+        self.output_compression = self.config.get("output", "compression", default=None)
+        # validates the format
+        get_output_file_name('', self.output_format)
+
+        # queue for the plots, rendered in one batch per model
+        self.plot_exporter = PlotExporter(workers=self.config.get('plot_export', 'workers', default=1),
+                                          fallback_to_html=self.config.get('plot_export', 'fallback_to_html',
+                                                                           default=False),
+                                          html_mode=self.config.get('plot_export', 'html_mode',
+                                                                    default='standalone'))
+
+        # number of processes for the models of a session, 0 uses all cores
+        if workers is None:
+            workers = self.config.get("workers", default=1)
+        self.workers = workers if workers > 0 else os.cpu_count()
+
+        # meta files of the models of a session are optional, the session summary is built from memory
+        self.write_meta_files = self.config.get("write_meta_files", default=True)
+        # sessions may be zip or tar archives, nothing is written into them
+        self.archive_path = split_archive_path(self.path)
+        if self.archive_path is not None:
+            self.write_meta_files = False
+
+        # with incremental runs, models and sessions with unchanged inputs are skipped
+        if incremental is None:
+            incremental = self.config.get("incremental", default=False)
+        self.manifest = None
+        if incremental:
+            self.manifest = Manifest(generate_file_path(self.result_path,
+                                                        self.config.get("manifest_file_name",
+                                                                        default=".meta_manifest.json")))
+
+        # parsed run files are cached as arrow files, which are memory-mapped on later runs
+        self.csv_cache = None
+        if self.config.get("csv_cache", "enabled", default=False):
+            cache_directory = self.config.get("csv_cache", "directory", default=None)
+            if cache_directory is None:
+                cache_directory = generate_file_path(self.result_path, ".csv_cache")
+            self.csv_cache = CsvCache(cache_directory)
+
+        # run files are read on a thread pool ahead of their use, while the files before are aggregated
+        self.prefetcher = None
+        if self.config.get("prefetch", "enabled", default=False):
+            self.prefetcher = Prefetcher(self.csv_cache, workers=self.config.get("prefetch", "workers", default=4),
+                                         depth=self.config.get("prefetch", "depth", default=8))
+
+        # summaries and run values of the sessions are upserted into a sqlite catalog for leaderboard queries
+        self.catalog = None
+        if self.config.get("catalog", "enabled", default=False):
+            catalog_path = self.config.get("catalog", "path", default=None)
+            if catalog_path is None:
+                catalog_path = generate_file_path(self.result_path, "results_catalog.sqlite")
+            self.catalog = ResultsCatalog(catalog_path)
+
+        # spans of the stages, pass an Instrumentation to add callbacks
+        if instrumentation is None:
+            instrumentation = Instrumentation(enabled=self.config.get("instrumentation", "enabled", default=False))
+        self.instrumentation = instrumentation
+
+        try:
+            if level == 0:
+                self.generate_per_model()
+            elif level == 1:
+                self.generate_per_session()
+        finally:
+            if level in [0, 1]:
+                self.close()
+
+        if level in [0, 1] and self.instrumentation.enabled:
+            self.export_trace()
 
     def __str__(self):
         return "MetaReporter(model_path: {} | result_path: {} | model_metrics: {} | session_metrics: {} |" \
@@ -55,193 +150,465 @@ class MetaReporter:
                                    self.session_metrics,
                                    self.drop_rows)
 
-    def generate_per_model(self, model_path=None, generate_plots=True):
-        """ generates the meta report for each model in the session with the same parameters"""
+    def close(self):
+        """Stops the renderer processes of the plot exporter and the prefetch threads, the reporter can still be used
+        afterwards."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        return self.plot_exporter.close()
+
+    def get_reader(self):
+        """Returns what the run files are read through, the prefetcher or the csv cache, None reads them directly."""
+        if self.prefetcher is not None:
+            return self.prefetcher
+        return self.csv_cache
+
+    @traced
+    def generate_per_model(self, model_path=None, generate_plots=True, model_index=None, write_meta=True):
+        """ generates the meta report for each model in the session with the same parameters.
+        Returns the calculated dataframes in the form of {meta_filename: dataframe}, None if the model is up to date
+        and was skipped. """
         if model_path is None:
             model_path = self.path
             result_path = self.result_path
         else:
-            result_path = model_path
+            result_path = self.get_model_result_path(model_path)
 
-        run_pattern = get_pattern('run_directory', self.config_path)
-        group_column = get_data_from_config("class_column_name", path=self.config_path)
+        group_column = self.config.get("class_column_name")
 
         # get files
-        file_patterns = get_patterns_to_look_for(self.config_path)
-        files = find_files_per_pattern(model_path, file_patterns)
-        files = remove_files_not_in_runs(files, run_pattern, model_path)
+        if model_index is None:
+            with span('scan_model', model=model_path):
+                model_index = scan_model(model_path, self.config)
 
         # {filename: {run: path}}
-        paths_per_run_of_file = get_paths_per_run_of_name(files, run_pattern, self.path)
-
-        # {filename: {dataframe}}, dataframe has column Run
-        dataframes_per_file = generate_dataframes_with_run(paths_per_run_of_file, group_column, self.drop_rows)
-
-        # calculate metrics
-        # {filename: dataframe}
-        calculated_dfs_per_file = calculate(dataframes_per_file, group_by=group_column, metrics=self.model_metrics,
-                                            drop_columns=['Run'])
-
-        meta_file_prefix = get_data_from_config('file_prefix', path=self.config_path)
+        paths_per_run_of_file = model_index.get_paths_per_run_of_name(self.runs)
+
+        # without meta files, there is nothing to reuse
+        use_manifest = self.manifest is not None and write_meta
+        if use_manifest:
+            # the run files and the config files of the model
+            inputs = self.manifest.fingerprint([*[path for paths_per_run in paths_per_run_of_file.values()
+                                                  for path in paths_per_run.values()], *model_index.config_files])
+            settings = self.get_settings_hash(result_path=result_path, generate_plots=generate_plots)
+            if self.manifest.is_up_to_date(model_path, inputs, settings):
+                # the runs may have been prefetched with the session
+                if self.prefetcher is not None:
+                    self.prefetcher.discard([path for paths_per_run in paths_per_run_of_file.values()
+                                             for path in paths_per_run.values()])
+                return None
+
+        self.prefetch_runs([model_index])
+
+        if self.streaming:
+            # runs are aggregated one at a time, the plots use the sampled runs
+            with span('aggregate_runs', model=model_path):
+                aggregates_per_file, dataframes_per_file = generate_aggregates_with_run(
+                    paths_per_run_of_file, group_column, self.drop_rows,
+                    sampled_runs=self.sampled_runs if generate_plots else 0, cache=self.get_reader())
+            calculated_dfs_per_file = {file_name: finalize_aggregate(aggregates, self.model_metrics)
+                                       for file_name, aggregates in aggregates_per_file.items()}
+        else:
+            # {filename: {dataframe}}, dataframe has column Run
+            with span('read_runs', model=model_path):
+                dataframes_per_file = generate_dataframes_with_run(paths_per_run_of_file, group_column,
+                                                                   self.drop_rows, self.get_reader())
+
+            # calculate metrics
+            # {filename: dataframe}
+            with span('calculate', model=model_path) as calculate_span:
+                calculated_dfs_per_file = calculate(dataframes_per_file, group_by=group_column,
+                                                    metrics=self.model_metrics, drop_columns=['Run'])
+                if calculate_span is not None:
+                    calculate_span['rows'] = sum(len(dataframe) for dataframe in dataframes_per_file.values())
+
+        meta_file_prefix = self.config.get('file_prefix')
         meta_file_names = ['_'.join([meta_file_prefix, name]) for name in dataframes_per_file.keys()]
-
-        # generate result csv files
-        nan_repr = get_data_from_config('nan_representation', path=self.config_path)
-        is_generated = dataframes_to_csv(result_path, calculated_dfs_per_file, meta_file_names, nan_repr)
-
+        output_file_names = [get_output_file_name(name, self.output_format) for name in meta_file_names]
+
+        # generate result files
+        if (write_meta or generate_plots) and not os.path.isdir(result_path):
+            os.makedirs(result_path)
+        if write_meta:
+            nan_repr = self.config.get('nan_representation')
+            with span('write_meta', model=model_path):
+                dataframes_to_files(result_path, calculated_dfs_per_file, output_file_names, nan_repr,
+                                    self.output_compression)
+            if result_path == self.get_model_result_path(model_index.path):
+                for output_file_name in output_file_names:
+                    model_index.add_meta_file(generate_file_path(result_path, output_file_name))
+
+        partial_file_names = []
+        if write_meta and self.write_partial_files:
+            if self.streaming:
+                partial_dfs_per_file = {file_name: flatten_aggregate(aggregates)
+                                        for file_name, aggregates in aggregates_per_file.items()}
+            else:
+                partial_dfs_per_file = calculate(dataframes_per_file, group_by=group_column,
+                                                 metrics=self.model_metrics, drop_columns=['Run'], partial=True)
+            partial_file_prefix = self.config.get('partial_aggregates', 'file_prefix', default='partial')
+            partial_file_names = [get_output_file_name('_'.join([partial_file_prefix, name]), self.output_format)
+                                  for name in partial_dfs_per_file.keys()]
+            with span('write_partial', model=model_path):
+                dataframes_to_files(result_path, partial_dfs_per_file, partial_file_names, '',
+                                    self.output_compression)
+
+        plot_files = []
         if generate_plots:
-            # generate bar plots
-            bar_plot_per_file = dict()
-            for file_name in meta_file_names:
-                title = file_name.split('.')[0]
-                output_file_name = '_'.join(['bar', title])
-
-                plot = self.generate_bar_plot(calculated_dfs_per_file[file_name.replace("meta_", "")], output_file_name,
-                                              title)
-                bar_plot_per_file[file_name] = plot
-
-            # generate violin plots
-            for file_name, dataframe in dataframes_per_file.items():
-                title = file_name.split('.')[0]
-                output_file_name = '_'.join(['violin', title])
+            plot_files = self.generate_plots(model_path, dataframes_per_file, calculated_dfs_per_file, result_path)
+
+        if use_manifest:
+            outputs = [generate_file_path(result_path, output_file_name)
+                       for output_file_name in output_file_names + partial_file_names]
+            self.manifest.update(model_path, inputs, settings, outputs + plot_files)
+            # models of a session are saved with the session
+            if model_path == self.path:
+                self.manifest.save()
+
+        return {meta_file_name: calculated_dfs_per_file[file_name]
+                for meta_file_name, file_name in zip(meta_file_names, dataframes_per_file.keys())}
+
+    def get_model_result_path(self, model_path):
+        """Returns the directory of the meta files of a model of the session, nothing is written into archives, their
+        meta files are written into a directory per model in the result path."""
+        if self.archive_path is not None:
+            return generate_file_path(self.result_path, os.path.basename(model_path))
+        return model_path
+
+    def read_meta_files(self, model_index):
+        """Returns the meta dataframes of the output format of the model in the form of {meta_filename: dataframe}."""
+        meta_files = model_index.meta_files
+        result_path = self.get_model_result_path(model_index.path)
+        if result_path != model_index.path:
+            meta_pattern = self.config.get_pattern('meta')
+            meta_files = {file_name: generate_file_path(result_path, file_name)
+                          for file_name in (sorted(os.listdir(result_path)) if os.path.isdir(result_path) else [])
+                          if meta_pattern.match(file_name)}
+
+        meta_files = {file_name: path for file_name, path in meta_files.items()
+                      if file_name == get_output_file_name(file_name, self.output_format)}
+        return generate_dataframe_of_file_per_model([model_index.path], {model_index.path: meta_files},
+                                                    self.drop_rows, self.config)[model_index.path]
+
+    def generate_plots_of_model(self, model_index):
+        """Generates the plots of the model from its stored meta files into the directory of the model in the result
+        path. The runs are only read for the violin and table plots, in streaming mode only the sampled ones."""
+        group_column = self.config.get("class_column_name")
+        meta_file_prefix = self.config.get('file_prefix')
+        meta_dfs_per_file = self.read_meta_files(model_index)
 
-                # sort violin chart corresponding to bar plot
-                meta_file_name = '_'.join([meta_file_prefix, file_name])
-                sorted_classes = [trace.name for trace in bar_plot_per_file[meta_file_name].figure.data]
-
-                self.generate_violin_plot(dataframe, output_file_name, title, sorted_classes, drop_columns=['Run'])
-
-            # generate table plots
-            # calculated dataframes usable for meta columns
+        # {filename: {run: path}}
+        paths_per_run_of_file = model_index.get_paths_per_run_of_name(self.runs)
+        if self.streaming:
+            paths_per_run_of_file = {file_name: dict([list(paths_per_run.items())[position] for position in
+                                                      sample_runs(len(paths_per_run), self.sampled_runs)])
+                                     for file_name, paths_per_run in paths_per_run_of_file.items()}
+
+        # files without (sampled) runs have no violin and table plots
+        dataframes_per_file = {file_name: None for file_name in paths_per_run_of_file.keys()}
+        with span('read_runs', model=model_index.path):
+            dataframes_per_file.update(generate_dataframes_with_run(
+                {file_name: paths_per_run for file_name, paths_per_run in paths_per_run_of_file.items()
+                 if len(paths_per_run) > 0}, group_column, self.drop_rows, self.get_reader()))
+
+        calculated_dfs_per_file = {file_name: meta_dfs_per_file[get_output_file_name(
+            '_'.join([meta_file_prefix, file_name]), self.output_format)] for file_name in dataframes_per_file.keys()}
+
+        result_path = generate_file_path(self.result_path, os.path.basename(model_index.path))
+        if not os.path.isdir(result_path):
+            os.makedirs(result_path)
+        return self.generate_plots(model_index.path, dataframes_per_file, calculated_dfs_per_file, result_path)
+
+    def generate_plots(self, model_path, dataframes_per_file, calculated_dfs_per_file, result_path):
+        """Generates the bar, violin and table plots of the model into the result path, returns the written files.
+        The dataframes are given per filename, the violin and table plots are skipped for files without runs."""
+        meta_file_prefix = self.config.get('file_prefix')
+
+        # generate bar plots
+        bar_plot_per_file = dict()
+        for file_name, calculated_df in calculated_dfs_per_file.items():
+            title = '_'.join([meta_file_prefix, file_name]).split('.')[0]
+            output_file_name = '_'.join(['bar', title])
+            bar_plot_per_file[file_name] = self.generate_bar_plot(calculated_df, output_file_name, title, result_path)
+
+        # the violin and table plots need the runs, in streaming mode they are skipped without sampled runs
+        dataframes_per_file = {file_name: dataframe for file_name, dataframe in dataframes_per_file.items()
+                               if dataframe is not None}
+
+        # generate violin plots
+        for file_name, dataframe in dataframes_per_file.items():
+            title = file_name.split('.')[0]
+            output_file_name = '_'.join(['violin', title])
+
+            # sort violin chart corresponding to bar plot
+            sorted_classes = [trace.name for trace in bar_plot_per_file[file_name].figure.data]
+
+            self.generate_violin_plot(dataframe, output_file_name, title, sorted_classes, drop_columns=['Run'],
+                                      result_path=result_path)
+
+        # generate table plots
+        # calculated dataframes usable for meta columns
+        with span('table_pivot', model=model_path):
             dataframes_per_file_for_tables = get_dataframes_per_file_for_table_plot(dataframes_per_file,
                                                                                     calculated_dfs_per_file)
-            for file_name, dataframe in dataframes_per_file_for_tables.items():
-                file_name = file_name.split('.')[0]
-                output_file_name = '_'.join(['table', file_name])
+        for file_name, dataframe in dataframes_per_file_for_tables.items():
+            file_name = file_name.split('.')[0]
+            output_file_name = '_'.join(['table', file_name])
 
-                self.generate_table_plot(dataframe, output_file_name, title=file_name)
+            self.generate_table_plot(dataframe, output_file_name, title=file_name, result_path=result_path)
 
-        return is_generated
+        with span('export_plots', model=model_path):
+            return self.plot_exporter.export(dashboard_name=os.path.basename(model_path))
 
+    @traced
     def generate_per_session(self):
         """ generates the meta report from all models in the session """
-        self.generate_collection_of_session()
-
-        model_paths = get_sub_directories(self.path)
-        for model in model_paths:
-            self.generate_per_model(model, generate_plots=False)
-
-        meta_files_per_model = get_meta_files_per_model(model_paths, self.config_path)
-
-        dfs_of_meta_file_per_model = generate_dataframe_of_file_per_model(model_paths, meta_files_per_model,
-                                                                          self.drop_rows,
-                                                                          self.config_path)
-
-        meta_file_prefix = get_data_from_config('file_prefix', path=self.config_path)
-        result_file_name = '_'.join([meta_file_prefix, '.'.join([os.path.basename(self.path), 'csv'])])
-        result_file_path = generate_file_path(self.result_path, result_file_name)
+        # {model_path: ModelIndex}
+        with span('scan_session', session=self.path):
+            session_index = scan_session(self.path, self.config)
+
+        result_file_path = self.get_session_result_file_path()
+
+        if self.manifest is not None:
+            # all inputs of the session, the session is skipped if none of them changed
+            session_inputs = self.manifest.fingerprint(
+                [path for model_index in session_index.values()
+                 for path in [*model_index.get_files_of_runs(), *model_index.config_files]])
+            session_settings = self.get_settings_hash()
+            if self.manifest.is_up_to_date(self.path, session_inputs, session_settings):
+                return True
+
+        self.generate_collection_of_session(session_index)
+
+        if self.manifest is None and (self.workers == 1 or len(session_index) == 1):
+            # the runs of the next models are read while a model is aggregated. With incremental runs, the models
+            # add their runs once they are not skipped
+            self.prefetch_runs(session_index.values())
+
+        # summaries are merged in the order of the models, independent of the number of workers
+        results = self.map_models(self.generate_summary_of_model, list(session_index.values()))
+        is_generated = self.write_session_summary([summary for summary, _ in results])
+
+        if self.manifest is not None:
+            # entries of models processed by worker processes
+            for model_path, (_, manifest_entry) in zip(session_index.keys(), results):
+                if manifest_entry is not None:
+                    self.manifest.set_entry(model_path, manifest_entry)
+
+            outputs = [result_file_path, self.get_collection_file_path()]
+            for model_path in session_index.keys():
+                outputs.extend(self.manifest.get_outputs(model_path))
+            self.manifest.update(self.path, session_inputs, session_settings, outputs)
+            self.manifest.save()
+
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
+        return is_generated
 
-        nan_rep = get_data_from_config('nan_representation', path=self.config_path)
-        duplicated_entry_identifiers = get_data_from_config("duplicates_identifier", path=self.config_path)
-        run_pattern = get_pattern('run_directory', path=self.config_path)
-        multiple_entries_in = get_data_from_config("multiple_entries_in", path=self.config_path)
+    def prefetch_runs(self, model_indices):
+        """Adds the run files of the models to the prefetch pipeline, in the order they are read."""
+        if self.prefetcher is None or self.archive_path is not None:
+            return False
+        return self.prefetcher.prefetch([path for model_index in model_indices
+                                         for paths_per_run in model_index.get_paths_per_run_of_name(self.runs).values()
+                                         for path in paths_per_run.values()])
+
+    def get_session_name(self):
+        if self.archive_path is not None and self.archive_path[1] == '':
+            return get_archive_name(self.path)
+        return os.path.basename(self.path)
+
+    def get_session_result_file_path(self):
+        meta_file_prefix = self.config.get('file_prefix')
+        result_file_name = get_output_file_name('_'.join([meta_file_prefix, self.get_session_name()]),
+                                                self.output_format)
+        return generate_file_path(self.result_path, result_file_name)
+
+    def write_session_summary(self, summary_per_model):
+        """Writes the summaries of the models into the result file of the session."""
+        if len(summary_per_model) == 0:
+            return True
+
+        # one row per model, written at once
+        session_data = pd.concat(summary_per_model, ignore_index=True)
+        with span('write_session', session=self.path):
+            return write_session_meta_result(session_data, self.get_session_result_file_path(),
+                                             self.config.get('nan_representation'),
+                                             self.config.get("duplicates_identifier"), self.output_compression)
+
+    @traced
+    def generate_summary_of_model(self, model_index, from_meta_files=False):
+        """ generates the meta files of the model and returns the summary dataframe of the model together with the
+        manifest entry of the model. With from_meta_files, the existing meta files of the model are used. """
+        model_path = model_index.path
+        # {meta_filename: dataframe}
+        df_per_file_name = None
+        if not from_meta_files:
+            df_per_file_name = self.generate_per_model(model_path, generate_plots=False, model_index=model_index,
+                                                       write_meta=self.write_meta_files)
+        if df_per_file_name is None:
+            # model is up to date or was generated before, read its meta files of the output format
+            df_per_file_name = self.read_meta_files(model_index)
+
+        multiple_entries_in = self.config.get("multiple_entries_in")
 
         # get the nodes from the config file and transform them into a list
-        nodes = get_data_from_config("config_data", path=self.config_path)
+        nodes = self.config.get("config_data")
         node_list = nodes_to_list(nodes)
 
-        # config_files_per_model = {model_path: [config_file_paths]}
-        config_files_per_model = get_model_config_files_per_model(model_paths, self.config_path)
-
-        is_generated = True
-        for model_path, df_per_file_name in dfs_of_meta_file_per_model.items():
-            number_of_runs = get_number_of_runs(model_path, run_pattern)
-
-            data = {'model': os.path.basename(model_path), 'runs': number_of_runs}
-            config_data = get_model_config_data(config_files_per_model[model_path], node_list, multiple_entries_in)
-            data.update(config_data)
-
-            model_data = generate_summary_dataframe_of_model(df_per_file_name, self.config_path, self.session_metrics,
-                                                             data)
-
-            is_generated = is_generated and write_session_meta_result(model_data, result_file_path, nan_rep,
-                                                                      duplicated_entry_identifiers)
-
-        return is_generated
-
-    def generate_bar_plot(self, dataframe, output_file_name, title):
-        column_identifiers = get_data_from_config('bar_plot_columns', path=self.config_path)
-
-        plot = BarPlotter(dataframe=dataframe, result_path=self.result_path, file_name=output_file_name, title=title,
-                          column_identifiers=column_identifiers)
-        plot.save_as(self.plot_format)
+        data = {'model': os.path.basename(model_path), 'runs': model_index.number_of_runs}
+        config_data = get_model_config_data(model_index.config_files, node_list, multiple_entries_in)
+        data.update(config_data)
+
+        summary = generate_summary_dataframe_of_model(df_per_file_name, self.config, self.session_metrics, data)
+        if self.catalog is not None:
+            with span('upsert_catalog', model=model_path):
+                self.catalog.upsert_model(self.path, data['model'], data['runs'], config_data,
+                                          generate_long_summary_dataframe(df_per_file_name, self.config,
+                                                                          self.model_metrics),
+                                          session_name=self.get_session_name())
+        manifest_entry = self.manifest.get_entry(model_path) if self.manifest is not None else None
+        return summary, manifest_entry
+
+    def merge_partial_aggregates(self, directories):
+        """Merges the partial aggregate files of the directories, e.g. the result paths of the nodes which processed
+        the shards of a model, in the given order. Only partial files of the output format are merged, files of other
+        formats are left from earlier runs. Writes the meta files and the merged partial files into the result path
+        and returns the meta dataframes in the form of {meta_filename: dataframe}.
+        The merged values equal the ones of a single run up to floating point rounding (relative error ~1e-15)."""
+        partial_pattern = self.config.get_pattern('partial')
+        partial_file_prefix = self.config.get('partial_aggregates', 'file_prefix', default='partial')
+
+        # {filename: [paths]}, filename without prefix and extension
+        paths_per_file = dict()
+        for directory in directories:
+            for file_name in sorted(os.listdir(directory)):
+                if partial_pattern.match(file_name) and get_file_format(file_name) == self.output_format:
+                    name = os.path.splitext(file_name[len(partial_file_prefix) + 1:])[0]
+                    paths_per_file.setdefault(name, []).append(generate_file_path(directory, file_name))
+
+        partial_dfs_per_file, calculated_dfs_per_file = merge_partial_files(paths_per_file, self.model_metrics)
+
+        meta_file_prefix = self.config.get('file_prefix')
+        meta_file_names = [get_output_file_name('_'.join([meta_file_prefix, name]), self.output_format)
+                           for name in calculated_dfs_per_file.keys()]
+        partial_file_names = [get_output_file_name('_'.join([partial_file_prefix, name]), self.output_format)
+                              for name in partial_dfs_per_file.keys()]
+        dataframes_to_files(self.result_path, calculated_dfs_per_file, meta_file_names,
+                            self.config.get('nan_representation'), self.output_compression)
+        dataframes_to_files(self.result_path, partial_dfs_per_file, partial_file_names, '', self.output_compression)
+
+        return {meta_file_name: calculated_dfs_per_file[name]
+                for meta_file_name, name in zip(meta_file_names, calculated_dfs_per_file.keys())}
+
+    def get_settings_hash(self, **kwargs):
+        """Returns the hash of all settings which influence the generated files."""
+        return hash_settings([self.config.data, self.model_metrics, self.session_metrics, self.drop_rows,
+                              self.plot_format, kwargs])
+
+    def map_models(self, function, model_indices):
+        """Applies the function to each model index. With more than one worker the models are processed on a
+        process pool. The results are returned in the order of the given models."""
+        if self.workers > 1 and len(model_indices) > 1:
+            results = []
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(model_indices))) as executor:
+                for result, spans in executor.map(partial(self.call_in_worker, function), model_indices):
+                    self.instrumentation.add_spans(spans)
+                    results.append(result)
+            return results
+        return [function(model_index) for model_index in model_indices]
+
+    def call_in_worker(self, function, argument):
+        """Calls the function in a worker process, returns the result with the spans recorded in the worker."""
+        result = function(argument)
+        return result, self.instrumentation.spans
+
+    def export_trace(self):
+        """Writes the recorded spans next to the outputs."""
+        trace_path = generate_file_path(self.result_path, self.config.get("instrumentation", "trace_file_name",
+                                                                          default="meta_trace.json"))
+        return self.instrumentation.export(trace_path, self.config.get("instrumentation", "trace_format",
+                                                                       default="json"))
+
+    def generate_bar_plot(self, dataframe, output_file_name, title, result_path=None):
+        from .visualization.BarPlotter import BarPlotter
+        column_identifiers = self.config.get('bar_plot_columns')
+
+        plot = BarPlotter(dataframe=dataframe, result_path=result_path or self.result_path, file_name=output_file_name,
+                          title=title, column_identifiers=column_identifiers)
+        plot.save_as(self.plot_format, self.plot_exporter)
         return plot
 
-    def generate_violin_plot(self, dataframe, output_file_name, title, order, drop_columns=[]):
+    def generate_violin_plot(self, dataframe, output_file_name, title, order, drop_columns=[], result_path=None):
+        from .visualization.ViolinPlotter import ViolinPlotter
         df = dataframe.reset_index(drop=False)
         df = df[[column for column in df.columns if column not in drop_columns]]
-        plot = ViolinPlotter(df, self.result_path, output_file_name, title)
-
-        # sort traces with bar order
-        ordered_traces = []
-        for clazz in order:
-            for violin in plot.figure.data:
-                if violin.name == clazz:
-                    ordered_traces.append(violin)
-
-        plot.figure.data = ordered_traces
-        plot.save_as(self.plot_format)
-
-    def generate_table_plot(self, dataframe, output_file_name, title):
+        # traces are sorted with bar order
+        plot = ViolinPlotter(df, result_path or self.result_path, output_file_name, title, order=order,
+                             max_points=self.config.get('plot_limits', 'max_points_per_trace', default=None),
+                             sampling=self.config.get('plot_limits', 'sampling', default=DEFAULT_SAMPLING_METHOD),
+                             kde=self.config.get('plot_limits', 'kde', default=False),
+                             kde_points=self.config.get('plot_limits', 'kde_points', default=100))
+        plot.save_as(self.plot_format, self.plot_exporter)
+
+    def generate_table_plot(self, dataframe, output_file_name, title, result_path=None):
+        from .visualization.TablePlotter import TablePlotter
         df = dataframe.reset_index(drop=False, inplace=False)
-        plot = TablePlotter(dataframe=df, result_path=self.result_path,
+        plot = TablePlotter(dataframe=df, result_path=result_path or self.result_path,
                             file_name=output_file_name, title=title)
-        plot.save_as(self.plot_format)
+        plot.save_as(self.plot_format, self.plot_exporter)
         return plot
 
-    def generate_collection_of_session(self):
+    @traced
+    def generate_collection_of_session(self, session_index=None):
         """Generates a file containing each value of the run per model"""
+        if session_index is None:
+            session_index = scan_session(self.path, self.config)
 
         # get dict of the form {model_path: {run: [files]}}
-        model_paths = get_sub_directories(self.path)
-        run_pattern = get_pattern('run_directory', path=self.config_path)
-        files_of_run_per_model = {model: dict() for model in model_paths}
-        file_patterns = get_patterns_to_look_for(self.config_path)
-        for model in model_paths:
-            sub_directories = get_sub_directories(model)
-            for sub_directory in sub_directories:
-                sub_directory_name = get_base_name(sub_directory)
-                if check_name(sub_directory_name, run_pattern):
-                    files = find_files_per_pattern(sub_directory, file_patterns)
-                    files_of_run_per_model[model][sub_directory_name] = files
-
-        data = dict()
+        files_of_run_per_model = {model: {run: model_index.get_files_of_run(run)
+                                          for run in model_index.run_directories}
+                                  for model, model_index in session_index.items()}
+
+        index_name = self.config.get("collected_data_index_name")
 
+        # files with a set in the form of [(path_name, model_name, run, set_name, file)]
+        path_names = []
+        set_files = []
         for model_path, files_per_run in files_of_run_per_model.items():
             model_name = get_base_name(model_path)
 
-            # fill data dict from dataframes
             for run, files in files_per_run.items():
                 path_name = '_'.join([model_name, run])
-                data[path_name] = dict()
+                path_names.append(path_name)
                 for file in files:
-                    dataframe = pd.read_csv(file)
-                    dataframe.set_index(list(dataframe.columns)[0], inplace=True)
-
-                    set_name = get_set_name(get_base_name(file), self.config_path, pattern='set')
-                    if set_name is None:
-                        continue
-
-                    for column in dataframe.columns:
-                        for clazz in dataframe.index:
-                            column_name = '_'.join([set_name, column, clazz])
-                            data[path_name].update({column_name: dataframe.loc[clazz, column]})
-
-        df = pd.DataFrame(data)
-        df = df.T
-
-        df.index.set_names(get_data_from_config("collected_data_index_name", path=self.config_path), inplace=True)
+                    set_name = get_set_name(get_base_name(file), self.config, pattern='set')
+                    if set_name is not None:
+                        set_files.append((path_name, model_name, run, set_name, file))
+
+        if self.prefetcher is not None and self.archive_path is None:
+            self.prefetcher.prefetch([file for *_, file in set_files])
+
+        # one long dataframe per file with one row per value
+        long_dfs = []
+        for path_name, model_name, run, set_name, file in set_files:
+            dataframe = read_csv(file, self.get_reader())
+            long_dfs.append(generate_long_dataframe(dataframe, {index_name: path_name, 'model': model_name,
+                                                                'run': run, 'set': set_name}))
+
+        df = concat_long_dataframes(long_dfs, [index_name, 'model', 'run', 'set'])
+        if self.catalog is not None:
+            with span('upsert_catalog', session=self.path):
+                self.catalog.upsert_run_values(self.path, df, session_name=self.get_session_name())
+        if self.config.get("collection_layout", default="wide") == "wide":
+            # one row per path, one column per set, metric and class
+            df = long_to_wide_dataframe(df, index_name, path_names)
+        else:
+            df.set_index(index_name, inplace=True)
 
-        path = generate_file_path(self.result_path, get_data_from_config("collection_file_name", path=self.config_path))
-        df.to_csv(path)
+        write_dataframe(df, self.get_collection_file_path(), compression=self.output_compression)
         return True
+
+    def get_collection_file_path(self):
+        return generate_file_path(self.result_path, get_output_file_name(self.config.get("collection_file_name"),
+                                                                         self.output_format))
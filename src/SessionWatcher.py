@@ -0,0 +1,117 @@
+import os
+import time
+
+from .MetaReporter import MetaReporter
+from .utils.utils_cache import MemoryCache
+from .utils.utils_index import scan_session
+from .utils.utils_instrumentation import span
+
+
+class SessionWatcher:
+    """
+    Keeps the reports of a session up to date while its runs are still being written.
+    The session is polled, a model is updated once its result and config files did not change for debounce seconds.
+    Only the meta files and the session row of the changed models are generated again. The collection file is
+    regenerated once no model is pending, from parsed files which are kept in memory between updates.
+    """
+
+    def __init__(self, path, result_path, config_path=None, poll_interval=None, debounce=None, callbacks=None):
+        self.path = path
+        self.reporter = MetaReporter(path, result_path, config_path=config_path, level=None, workers=1,
+                                     incremental=False)
+        self.config = self.reporter.config
+        # parsed files stay in memory, misses go through the csv cache if it is enabled
+        self.reporter.csv_cache = MemoryCache(self.reporter.csv_cache)
+        # unchanged files are taken from memory, prefetching would read them again
+        if self.reporter.prefetcher is not None:
+            self.reporter.prefetcher.close()
+            self.reporter.prefetcher = None
+
+        self.poll_interval = poll_interval if poll_interval is not None else \
+            self.config.get("watch", "poll_interval", default=2.0)
+        self.debounce = debounce if debounce is not None else self.config.get("watch", "debounce", default=5.0)
+        # called with the list of updated model paths after each update
+        self.callbacks = list(callbacks) if callbacks is not None else []
+
+        # last seen files of each model {model_path: {path: (mtime, size)}}
+        self.snapshots = dict()
+        # models with changes which are not processed yet {model_path: time of the last change}
+        self.pending = dict()
+        # the collection file is regenerated once no model is pending, files may still be written until then
+        self.collection_outdated = False
+
+    def __str__(self):
+        return "SessionWatcher(path: {} | models: {} | pending: {} | poll_interval: {} | debounce: {})".format(
+            self.path, len(self.snapshots), len(self.pending), self.poll_interval, self.debounce)
+
+    @staticmethod
+    def get_snapshot(model_index):
+        snapshot = dict()
+        for path in [*model_index.get_files_of_runs(), *model_index.config_files]:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # removed since the scan
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, now=None):
+        """Checks the session for changes once and updates the models whose changes are older than debounce.
+        Returns the updated model paths."""
+        if now is None:
+            now = time.monotonic()
+
+        with span('scan_session', session=self.path):
+            session_index = scan_session(self.path, self.config)
+
+        removed = [model_path for model_path in self.snapshots.keys() if model_path not in session_index]
+        for model_path in removed:
+            del self.snapshots[model_path]
+            self.pending.pop(model_path, None)
+
+        for model_path, model_index in session_index.items():
+            snapshot = self.get_snapshot(model_index)
+            if snapshot != self.snapshots.get(model_path):
+                self.snapshots[model_path] = snapshot
+                self.pending[model_path] = now
+
+        ready = [model_path for model_path, changed in self.pending.items() if now - changed >= self.debounce]
+        for model_path in ready:
+            del self.pending[model_path]
+        if len(ready) > 0 or len(removed) > 0:
+            self.collection_outdated = True
+
+        if len(ready) > 0:
+            self.update(ready, session_index)
+        if self.collection_outdated and len(self.pending) == 0:
+            self.update_collection(session_index)
+
+        if len(ready) > 0:
+            for callback in self.callbacks:
+                callback(ready)
+        return ready
+
+    def update(self, model_paths, session_index):
+        """Generates the meta files and session rows of the models."""
+        with span('update', session=self.path, models=len(model_paths)):
+            summaries = [self.reporter.generate_summary_of_model(session_index[model_path])[0]
+                         for model_path in model_paths]
+            return self.reporter.write_session_summary(summaries)
+
+    def update_collection(self, session_index):
+        """Generates the collection file of the session, unchanged files are taken from memory."""
+        self.reporter.generate_collection_of_session(session_index)
+        self.collection_outdated = False
+
+        # parsed files of removed runs are not needed anymore
+        self.reporter.csv_cache.prune([path for snapshot in self.snapshots.values() for path in snapshot.keys()])
+        return True
+
+    def watch(self, timeout=None):
+        """Polls the session until timeout seconds passed, forever if timeout is None."""
+        start = time.monotonic()
+        while timeout is None or time.monotonic() - start < timeout:
+            self.poll()
+            time.sleep(self.poll_interval)
+        return True
@@ -1,5 +1,14 @@
-from icecream import ic
 from .utils import *
 from .MetaReporter import MetaReporter
+from .BatchReporter import BatchReporter
+from .SessionWatcher import SessionWatcher
 
-ic.configureOutput(includeContext=True)
+
+def __getattr__(name):
+    """icecream is only needed for debugging, it is imported and configured on first access of src.ic"""
+    if name == 'ic':
+        from icecream import ic
+        ic.configureOutput(includeContext=True)
+        globals()['ic'] = ic
+        return ic
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,11 @@
 from .utils import *
+from .utils_aggregation import *
+from .utils_cache import *
+from .utils_catalog import *
 from .utils_config import *
 from .utils_files import *
+from .utils_index import *
 from .utils_pandas import *
+from .utils_prefetch import *
+from .utils_queue import *
 from .utils_visualization import *
@@ -1,14 +1,14 @@
 import re
-from .utils_config import get_pattern
 
 
 def check_name(name, pattern):
-    regex = re.compile(pattern)
+    """Checks if the name matches the pattern, the pattern is either a string or a compiled regex."""
+    regex = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
     return regex.match(name) is not None
 
 
-def get_set_name(file_name, config_path, pattern="meta_set"):
-    regex = re.compile(get_pattern(pattern, config_path))
+def get_set_name(file_name, config, pattern="meta_set"):
+    regex = config.get_pattern(pattern)
     matches = regex.search(file_name)
     set_name = matches.group(1) if matches else None
     return set_name
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# statistics of the mergeable state, m2 is the sum of the squared differences from the mean (Welford)
+STATE_STATISTICS = ['count', 'mean', 'm2', 'min', 'max']
+# metrics which can be calculated from the state
+STREAMING_METRICS = ['count', 'sum', 'mean', 'var', 'std', 'min', 'max']
+
+
+def check_streaming_metrics(metrics):
+    for metric in metrics:
+        if metric not in STREAMING_METRICS:
+            raise ValueError(f"'{metric}' can not be calculated from aggregates, use one of {STREAMING_METRICS}.")
+    return True
+
+
+def aggregate(dataframe, group_by):
+    """Returns the mergeable state of each column per group.
+    The state has the groups as index and the columns (statistic, column)."""
+    grouped = dataframe.groupby(group_by, sort=False)
+    count = grouped.count()
+    statistics = {'count': count,
+                  'mean': grouped.mean(),
+                  'm2': (grouped.var(ddof=0) * count).fillna(0.0),
+                  'min': grouped.min(),
+                  'max': grouped.max()}
+    return pd.concat(statistics, axis='columns')
+
+
+def get_statistic(state, statistic, index, columns, fill_value):
+    values = state[statistic].reindex(index=index, columns=columns).to_numpy(dtype=float)
+    return np.where(np.isnan(values), fill_value, values)
+
+
+def merge_aggregates(state, other):
+    """Merges two states, groups and columns keep the order of their first appearance.
+    None is an empty state. Means and variances of merged states differ from the ones calculated over all values at
+    once by floating point rounding only (relative error ~1e-15), counts, minima and maxima are exact."""
+    if state is None:
+        return other
+    if other is None:
+        return state
+
+    index = state.index.append(other.index[~other.index.isin(state.index)])
+    columns = state['count'].columns
+    columns = columns.append(other['count'].columns[~other['count'].columns.isin(columns)])
+
+    count_a = get_statistic(state, 'count', index, columns, 0.0)
+    count_b = get_statistic(other, 'count', index, columns, 0.0)
+    mean_a = get_statistic(state, 'mean', index, columns, 0.0)
+    mean_b = get_statistic(other, 'mean', index, columns, 0.0)
+    count = count_a + count_b
+
+    # parallel variant of Welford's algorithm (Chan et al.)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(count > 0, mean_a + delta * count_b / count, np.nan)
+        m2 = get_statistic(state, 'm2', index, columns, 0.0) + get_statistic(other, 'm2', index, columns, 0.0) + \
+            np.where(count > 0, delta ** 2 * count_a * count_b / count, 0.0)
+
+    statistics = {'count': count,
+                  'mean': mean,
+                  'm2': m2,
+                  'min': np.fmin(get_statistic(state, 'min', index, columns, np.nan),
+                                 get_statistic(other, 'min', index, columns, np.nan)),
+                  'max': np.fmax(get_statistic(state, 'max', index, columns, np.nan),
+                                 get_statistic(other, 'max', index, columns, np.nan))}
+    return pd.concat({statistic: pd.DataFrame(values, index=index, columns=columns)
+                      for statistic, values in statistics.items()}, axis='columns')
+
+
+def finalize_aggregate(state, metrics):
+    """Calculates the metrics of each column from the state, the columns are named like the ones of calculate."""
+    check_streaming_metrics(metrics)
+    count = state['count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = state['m2'] / (count - 1).where(count > 1)
+    values = {'count': count,
+              'sum': state['mean'].where(count > 0, 0.0) * count,
+              'mean': state['mean'],
+              'var': var,
+              'std': np.sqrt(var),
+              'min': state['min'],
+              'max': state['max']}
+
+    result = pd.concat({metric: values[metric] for metric in metrics}, axis='columns')
+    # order of calculate: metrics per column
+    result = result.swaplevel(axis='columns')[list(count.columns)]
+    result.columns = ['_'.join([str(column), metric]).strip() for column, metric in result.columns]
+    return result
+
+
+def flatten_aggregate(state):
+    """Returns the state with one column per column and statistic, named column_statistic, e.g. to write it."""
+    flat = state.swaplevel(axis='columns')[list(state['count'].columns)]
+    flat.columns = ['_'.join([str(column), statistic]) for column, statistic in flat.columns]
+    return flat
+
+
+def unflatten_aggregate(dataframe):
+    """Inverse of flatten_aggregate, the index of the dataframe are the groups."""
+    columns = [tuple(reversed(column.rsplit('_', 1))) for column in dataframe.columns]
+    for statistic, column in columns:
+        if statistic not in STATE_STATISTICS:
+            raise ValueError(f"'{column}_{statistic}' is no column of a partial aggregate.")
+    state = dataframe.copy()
+    state.columns = pd.MultiIndex.from_tuples(columns)
+    return pd.concat({statistic: state[statistic] for statistic in STATE_STATISTICS}, axis='columns')
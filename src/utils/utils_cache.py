@@ -0,0 +1,106 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from .utils_files import atomic_file_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    # the cache is disabled without pyarrow
+    pa = None
+    feather = None
+
+CACHE_FILE_EXTENSION = 'arrow'
+
+
+def has_arrow():
+    return pa is not None
+
+
+class CsvCache:
+    """On-disk cache of parsed csv files as uncompressed Arrow (feather) files, which are memory-mapped on reads.
+    There is one cache file per csv file, it is valid as long as mtime and size of the csv file are unchanged."""
+
+    def __init__(self, directory):
+        if not has_arrow():
+            raise ImportError("The csv cache needs pyarrow, install it or disable csv_cache.")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_cache_file(self, path):
+        name = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, '.'.join([name, CACHE_FILE_EXTENSION]))
+
+    @staticmethod
+    def get_key(path):
+        stat = os.stat(path)
+        return {b'mtime': str(stat.st_mtime_ns).encode(), b'size': str(stat.st_size).encode()}
+
+    def read(self, path):
+        """Returns the dataframe of the csv file and the path of the file it was read from."""
+        key = self.get_key(path)
+        cache_file = self.get_cache_file(path)
+
+        if os.path.exists(cache_file):
+            table = feather.read_table(cache_file, memory_map=True)
+            metadata = table.schema.metadata or dict()
+            if all(metadata.get(name) == value for name, value in key.items()):
+                return table.to_pandas(), cache_file
+
+        dataframe = pd.read_csv(path)
+        self.write(cache_file, dataframe, key)
+        return dataframe, path
+
+    @staticmethod
+    def write(cache_file, dataframe, key):
+        try:
+            table = pa.Table.from_pandas(dataframe, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # e.g. columns with mixed types, these files are not cached
+            return False
+        table = table.replace_schema_metadata({**(table.schema.metadata or dict()), **key})
+        with atomic_file_path(cache_file) as tmp_path:
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+        return True
+
+    def clear(self):
+        """Removes all cache files."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.' + CACHE_FILE_EXTENSION):
+                os.remove(entry.path)
+        return True
+
+
+class MemoryCache:
+    """In-memory cache of parsed csv files for long running processes, an entry is valid as long as mtime and size
+    of the csv file are unchanged. Misses are read through the parent cache (e.g. a CsvCache) if given.
+    Reads return copies, the cached dataframes are never modified."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        # {path: ((mtime, size), dataframe)}
+        self.entries = dict()
+
+    def read(self, path):
+        """Returns the dataframe of the csv file and the path of the file it was read from, None if it was cached."""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1].copy(), None
+
+        if self.parent is not None:
+            dataframe, source = self.parent.read(path)
+        else:
+            dataframe, source = pd.read_csv(path), path
+        self.entries[path] = (key, dataframe)
+        return dataframe.copy(), source
+
+    def prune(self, paths):
+        """Removes the entries of all files which are not in paths."""
+        paths = set(paths)
+        self.entries = {path: entry for path, entry in self.entries.items() if path in paths}
+        return True
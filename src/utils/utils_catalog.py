@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT NOT NULL PRIMARY KEY,
+    name TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS models (
+    session TEXT NOT NULL,
+    model TEXT NOT NULL,
+    runs INTEGER,
+    updated REAL,
+    PRIMARY KEY (session, model)
+);
+CREATE TABLE IF NOT EXISTS model_config (
+    session TEXT NOT NULL,
+    model TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    numeric_value REAL,
+    PRIMARY KEY (session, model, key)
+);
+CREATE INDEX IF NOT EXISTS model_config_key_value ON model_config (key, value);
+CREATE TABLE IF NOT EXISTS summary (
+    session TEXT NOT NULL,
+    model TEXT NOT NULL,
+    set_name TEXT NOT NULL,
+    class TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    statistic TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (session, model, set_name, class, metric, statistic)
+);
+CREATE INDEX IF NOT EXISTS summary_metric ON summary (set_name, metric, statistic, class);
+CREATE TABLE IF NOT EXISTS run_values (
+    session TEXT NOT NULL,
+    model TEXT NOT NULL,
+    run TEXT NOT NULL,
+    set_name TEXT NOT NULL,
+    class TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (session, model, run, set_name, class, metric)
+);
+CREATE INDEX IF NOT EXISTS run_values_metric ON run_values (set_name, metric, class);
+"""
+
+
+def to_number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultsCatalog:
+    """SQLite catalog of the summaries and run values of the sessions, rows of a model or session are replaced when
+    they are written again. Several processes may write into the same catalog.
+    Sessions are identified by their absolute path, their name is stored in the table sessions.
+    The config values of the models are stored as text, numbers also as numeric_value."""
+
+    def __init__(self, path, timeout=60):
+        self.path = path
+        self.timeout = timeout
+        with closing(self.connect()) as connection:
+            # readers do not block the writer
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    @staticmethod
+    def get_session_key(session):
+        return os.path.abspath(session)
+
+    def upsert_model(self, session, model, runs, config_data, summary, session_name=None):
+        """Replaces the rows of the model of the session (path). config_data is a dict {key: value}, summary a
+        dataframe with the columns set, class, metric, statistic and value."""
+        session = self.get_session_key(session)
+        config_rows = [(session, model, key, None if value is None else str(value), to_number(value))
+                       for key, value in config_data.items()]
+        summary_rows = [(session, model, set_name, str(class_name), metric, statistic, to_number(value))
+                        for set_name, class_name, metric, statistic, value in
+                        summary[['set', 'class', 'metric', 'statistic', 'value']].itertuples(index=False)]
+
+        with closing(self.connect()) as connection, connection:
+            self.upsert_session(connection, session, session_name)
+            connection.execute("DELETE FROM model_config WHERE session = ? AND model = ?", (session, model))
+            connection.execute("DELETE FROM summary WHERE session = ? AND model = ?", (session, model))
+            connection.execute("INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?)", (session, model, runs, time.time()))
+            connection.executemany("INSERT INTO model_config VALUES (?, ?, ?, ?, ?)", config_rows)
+            connection.executemany("INSERT OR REPLACE INTO summary VALUES (?, ?, ?, ?, ?, ?, ?)", summary_rows)
+        return True
+
+    def upsert_run_values(self, session, run_values, session_name=None):
+        """Replaces the run values of the session (path), run_values is a dataframe with the columns model, run, set,
+        class, metric and value."""
+        session = self.get_session_key(session)
+        rows = [(session, model, run, set_name, str(class_name), metric, to_number(value))
+                for model, run, set_name, class_name, metric, value in
+                run_values[['model', 'run', 'set', 'class', 'metric', 'value']].itertuples(index=False)]
+
+        with closing(self.connect()) as connection, connection:
+            self.upsert_session(connection, session, session_name)
+            connection.execute("DELETE FROM run_values WHERE session = ?", (session,))
+            connection.executemany("INSERT OR REPLACE INTO run_values VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return True
+
+    @staticmethod
+    def upsert_session(connection, session, name):
+        if name is None:
+            name = os.path.basename(session)
+        connection.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session, name, time.time()))
+
+    def remove_session(self, session):
+        session = self.get_session_key(session)
+        with closing(self.connect()) as connection, connection:
+            for table in ['sessions', 'models', 'model_config', 'summary', 'run_values']:
+                connection.execute(f"DELETE FROM {table} WHERE session = ?", (session,))
+        return True
+
+    def query(self, sql, parameters=()):
+        """Returns the result of the sql query as dataframe."""
+        with closing(self.connect()) as connection:
+            return pd.read_sql_query(sql, connection, params=parameters)
+
+    @staticmethod
+    def get_filter_sql(filters, table='scores'):
+        """Returns the sql conditions and parameters which select the models with the config values {key: value}."""
+        conditions = []
+        parameters = []
+        for key, value in (filters or dict()).items():
+            conditions.append(f"EXISTS (SELECT 1 FROM model_config f WHERE f.session = {table}.session AND "
+                              f"f.model = {table}.model AND f.key = ? AND f.value = ?)")
+            parameters.extend([key, str(value)])
+        return conditions, parameters
+
+    def top_k(self, set_name, metric, statistic='max', k=10, class_name=None, group_by=None, filters=None,
+              ascending=False):
+        """Returns the k best models by the statistic of the metric, averaged over the classes if class_name is None.
+        With group_by, a config key like 'optimizer_type', the k best models of each of its values are returned.
+        filters {config key: value} selects the models."""
+        class_condition = "AND class = ?" if class_name is not None else ""
+        parameters = [set_name, metric, statistic] + ([str(class_name)] if class_name is not None else [])
+
+        group_join = ""
+        group_column = "NULL"
+        if group_by is not None:
+            group_join = "JOIN model_config g ON g.session = scores.session AND g.model = scores.model AND g.key = ?"
+            group_column = "g.value"
+            parameters.append(group_by)
+
+        conditions, filter_parameters = self.get_filter_sql(filters)
+        parameters.extend(filter_parameters)
+        where = "WHERE " + " AND ".join(conditions) if len(conditions) > 0 else ""
+        parameters.append(k)
+
+        order = "ASC" if ascending else "DESC"
+        sql = f"""
+            WITH scores AS (
+                SELECT session, model, AVG(value) AS value FROM summary
+                WHERE set_name = ? AND metric = ? AND statistic = ? {class_condition}
+                GROUP BY session, model
+            ), ranked AS (
+                SELECT {group_column} AS group_value, scores.session, sessions.name AS session_name, scores.model,
+                    scores.value,
+                    ROW_NUMBER() OVER (PARTITION BY {group_column} ORDER BY scores.value {order}) AS rank
+                FROM scores JOIN sessions ON sessions.session = scores.session {group_join} {where}
+            )
+            SELECT * FROM ranked WHERE rank <= ? ORDER BY group_value, rank
+        """
+        result = self.query(sql, parameters)
+        if group_by is None:
+            result = result.drop(columns=['group_value'])
+        else:
+            result = result.rename(columns={'group_value': group_by})
+        return result
+
+    def get_models(self, filters=None):
+        """Returns the models with one column per config key, filters {config key: value} selects the models."""
+        conditions, parameters = self.get_filter_sql(filters, table='models')
+        where = "WHERE " + " AND ".join(conditions) if len(conditions) > 0 else ""
+        models = self.query(f"SELECT models.session, sessions.name AS session_name, model, runs FROM models "
+                            f"JOIN sessions ON sessions.session = models.session {where} "
+                            f"ORDER BY models.session, model", parameters)
+        config = self.query("SELECT session, model, key, value FROM model_config")
+        if len(config) == 0:
+            return models
+        config = config.pivot(index=['session', 'model'], columns='key', values='value').reset_index()
+        config.columns.name = None
+        return models.merge(config, on=['session', 'model'], how='left')
+
+    def compare(self, models, set_name, metric, statistic='max'):
+        """Returns the statistic of the metric per class (rows) and model (columns, <session path>/<model>) of the
+        models [(session, model)]."""
+        if len(models) == 0:
+            return pd.DataFrame(index=pd.Index([], name='class'))
+        models = [(self.get_session_key(session), model) for session, model in models]
+        placeholders = " OR ".join(["(session = ? AND model = ?)"] * len(models))
+        parameters = [set_name, metric, statistic] + [value for session_model in models for value in session_model]
+        values = self.query(f"SELECT session, model, class, value FROM summary "
+                            f"WHERE set_name = ? AND metric = ? AND statistic = ? AND ({placeholders})", parameters)
+        values['model'] = [os.path.join(session, model) for session, model in zip(values['session'], values['model'])]
+        result = values.pivot(index='class', columns='model', values='value')
+        result.columns.name = None
+        return result
@@ -1,12 +1,69 @@
 import json
+import re
+
+from .utils_files import open_file, get_file_stat
+
+# parsed json files in the form of {path: (mtime, size, data)}
+_json_cache = dict()
+
+_missing = object()
+
+
+def load_json(path):
+    """Loads the json file, the parsed data is cached until the file changes. The file may be in an archive."""
+    mtime, size = get_file_stat(path)
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == mtime and cached[1] == size:
+        return cached[2]
+
+    with open_file(path) as json_file:
+        data = json.load(json_file)
+    _json_cache[path] = (mtime, size, data)
+    return data
+
+
+def get_nodes(data, nodes):
+    for value in nodes:
+        data = data[value]
+    return data
+
+
+class ReporterConfig:
+    """Config of the reporter, the file is parsed once and all patterns are compiled."""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = load_json(path)
+        self.patterns = {name: re.compile(pattern) for name, pattern in self.data['pattern'].items()}
+
+    def get(self, *nodes, default=_missing):
+        """Returns the value of the nodes, default is returned for missing nodes if given."""
+        try:
+            return get_nodes(self.data, nodes)
+        except KeyError:
+            if default is _missing:
+                raise
+            return default
+
+    def get_pattern(self, name):
+        return self.patterns[name]
+
+    def get_patterns(self, names):
+        return [self.get_pattern(name) for name in names]
+
+    def get_patterns_to_look_for(self):
+        return self.get_patterns(self.data['look_for'])
+
+
+def load_config(path):
+    """Returns the ReporterConfig of the given path, path may also be a ReporterConfig."""
+    if isinstance(path, ReporterConfig):
+        return path
+    return ReporterConfig(path)
 
 
 def get_data_from_config(*nodes, path):
-    with open(path) as config_file:
-        data = json.load(config_file)
-        for value in nodes:
-            data = data[value]
-        return data
+    return get_nodes(load_json(path), nodes)
 
 
 def get_pattern(name, path):
@@ -18,15 +75,14 @@ def get_patterns(names, path):
 
 
 def get_patterns_to_look_for(path):
-    with open(path) as config_file:
-        data = json.load(config_file)
-        return get_patterns(data['look_for'], path)
+    return get_patterns(get_data_from_config('look_for', path=path), path)
 
 
 def get_model_data_from_config(node_list, model_config_path):
+    model_config = load_json(model_config_path)
     data = {}
     for nodes in node_list:
-        config_data = get_data_from_config(*nodes, path=model_config_path)
+        config_data = get_nodes(model_config, nodes)
         if isinstance(config_data, dict):
             for key, value in config_data.items():
                 data_key = "_".join([*nodes, key])
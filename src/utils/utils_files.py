@@ -1,125 +1,191 @@
+import io
 import os
-from .utils import check_name
-from .utils_config import get_pattern, get_patterns_to_look_for
+import shutil
+import tarfile
+import tempfile
+import threading
+import uuid
+import zipfile
+from contextlib import contextmanager
 
+# separates the path of an archive and the name of a member, e.g. session.tar.gz!/session/model/run1/metrics.csv
+ARCHIVE_SEPARATOR = '!/'
+ARCHIVE_EXTENSIONS = ['.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tar', '.zip']
 
-def find_files_per_pattern(path, look_for):
-    if not os.path.exists(path):
-        return None
+# magic bytes of gzip, bzip2 and xz files
+COMPRESSION_MAGIC = [b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00']
 
-    file_paths = []
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            if any([check_name(file, pattern) for pattern in look_for]):
-                file_paths.append(os.path.join(root, file))
-    return file_paths
-
-
-def get_run_of_file(path, pattern, stop_path):
-    parent = os.path.dirname(path)
-    while not check_name(os.path.basename(parent), pattern):
-        if parent == stop_path:
-            return None
-        parent = os.path.dirname(parent)
-    return os.path.basename(parent)
-
-
-def extract_file_names(files):
-    file_names = [get_base_name(file) for file in files]
-    return sorted(list(set(file_names)))
+# opened archives in the form of {(pid, path): ((mtime, size), Archive)}, forked processes open their own handles
+_archives = dict()
+# members of interest of the archives in the form of {path: set of member names}, given by the scan of the models,
+# forked processes inherit them
+_selected_members = dict()
 
 
 def get_base_name(file):
     return os.path.basename(file)
 
 
-def get_files_per_name(files):
-    # found file names
-    file_names = extract_file_names(files)
-    # generate hashmap with file name as key and files as value
-    paths_of_file = {file_name: [] for file_name in file_names}
-    for file in files:
-        file_name = get_base_name(file)
-        paths_of_file[file_name].append(file)
-    return paths_of_file
-
-
-def remove_files_not_in_runs(files, run_pattern, root_dir):
-    for file in files.copy():
-        if not get_run_of_file(file, run_pattern, root_dir):
-            files.remove(file)
-    return files
-
-
 def generate_file_path(path, file_name):
     return os.path.join(path, file_name)
 
 
+@contextmanager
+def atomic_file_path(path):
+    """Yields a temporary path next to the given path, the temporary file replaces the file at path once the
+    block is finished. Readers never see a partially written file."""
+    directory, file_name = os.path.split(path)
+    tmp_path = os.path.join(directory, '.{}.{}.tmp'.format(file_name, uuid.uuid4().hex))
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def get_sub_directories(path):
     return [f.path for f in os.scandir(path) if f.is_dir()]
 
 
-def get_files_per_model(path, models, config_path):
-    # get patterns
-    run_pattern = get_pattern('run_directory', config_path)
-    file_patterns = get_patterns_to_look_for(config_path)
-    files_per_model = {model: [] for model in models}
-    # get files
-    for model in models:
-        files = find_files_per_pattern(model, file_patterns)
-        files = remove_files_not_in_runs(files, run_pattern, path)
-        files_per_model[model] = get_files_per_name(files)
-    return files_per_model
-
-
-def get_model_config_files_per_model(models, config_path):
-    config_files_per_model = {}
-    config_pattern = get_pattern("model_config", path=config_path)
-    model_dir_pattern = get_pattern("model_directory", path=config_path)
-    for model in models:
-        files = find_files_per_pattern(model, [config_pattern])
-        files_ = files.copy()
-        for file in files_:
-            if not check_name(os.path.basename(os.path.dirname(file)), model_dir_pattern):
-                files.remove(file)
-        config_files_per_model[model] = files
-    return config_files_per_model
-
-
-def check_directory_basename(path, pattern):
-    return check_name(os.path.basename(path), pattern)
-
-
-def get_number_of_runs(model_path, run_pattern):
-    number_of_runs = 0
-    for sub in get_sub_directories(model_path):
-        if check_directory_basename(sub, run_pattern):
-            number_of_runs += 1
-    return number_of_runs
-
-
-def get_paths_per_run_of_name(files, run_pattern, root_dir):
-    """Returns a dict in the form of {filename: {run: path}}"""
-    file_names = extract_file_names(files)
-
-    paths_per_run_of_file = {file_name: dict() for file_name in file_names}
-    for file in files:
-        run = get_run_of_file(file, run_pattern, root_dir)
-        file_name = get_base_name(file)
-        paths_per_run_of_file[file_name][run] = file
-
-    return paths_per_run_of_file
-
-
-def get_meta_files_per_model(models, config_path):
-    """Returns a dict in the form of {model_path: {filename: file_path}}"""
-    # get pattern
-    file_pattern = get_pattern('meta', config_path)
-    files_per_model = {model: dict() for model in models}
-    # get files
-    for model in models:
-        files = find_files_per_pattern(model, [file_pattern])
-        for file in files:
-            file_name = get_base_name(file)
-            files_per_model[model][file_name] = file
-    return files_per_model
+class Archive:
+    """Zip or tar archive, its members are listed once when it is opened."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # {member name: size} of the files
+        self.sizes = dict()
+        # names of all directories, also the ones which are only implied by files
+        self.directories = set()
+
+        if zipfile.is_zipfile(path):
+            self.file = zipfile.ZipFile(path)
+            for info in self.file.infolist():
+                if info.is_dir():
+                    self.directories.add(info.filename.rstrip('/'))
+                else:
+                    self.sizes[info.filename] = info.file_size
+        else:
+            self.file = tarfile.open(path)
+            # {member name: TarInfo} in archive order
+            self.members = dict()
+            # compressed streams can only be read forward, the selected members are unpacked in archive order into
+            # a temporary file, in the form of {member name: (offset, size)}
+            with open(path, 'rb') as archive_file:
+                start = archive_file.read(6)
+            self.compressed = any(start.startswith(magic) for magic in COMPRESSION_MAGIC)
+            self.unpacked = dict()
+            self.unpacked_file = None
+            for member in self.file.getmembers():
+                name = member.name[2:] if member.name.startswith('./') else member.name
+                if member.isdir():
+                    self.directories.add(name.rstrip('/'))
+                elif member.isfile():
+                    self.sizes[name] = member.size
+                    self.members[name] = member
+
+        for name in self.sizes.keys():
+            parent = os.path.dirname(name)
+            while parent != '' and parent not in self.directories:
+                self.directories.add(parent)
+                parent = os.path.dirname(parent)
+
+    @property
+    def names(self):
+        """Names of all files, sorted like a depth first scan with sorted directory entries."""
+        return sorted(self.sizes.keys(), key=lambda name: name.split('/'))
+
+    def open(self, name):
+        """Returns a binary file object of the member."""
+        if isinstance(self.file, zipfile.ZipFile):
+            return self.file.open(name)
+        # tar members are read from one shared stream
+        with self.lock:
+            if self.compressed and name not in self.unpacked:
+                selected = _selected_members.get(self.path, set())
+                if name in selected:
+                    self.unpack(selected)
+            if name not in self.unpacked:
+                # members which are not selected are streamed, but never buffered
+                return io.BytesIO(self.file.extractfile(self.members[name]).read())
+            offset, size = self.unpacked[name]
+            self.unpacked_file.seek(offset)
+            return io.BytesIO(self.unpacked_file.read(size))
+
+    def unpack(self, names):
+        """Decompresses the given members of a compressed tar archive, which are not unpacked yet, in one pass into
+        a temporary file. The other members are skipped."""
+        if self.unpacked_file is None:
+            self.unpacked_file = tempfile.TemporaryFile()
+        self.unpacked_file.seek(0, os.SEEK_END)
+        for name, member in self.members.items():
+            if name in names and name not in self.unpacked:
+                self.unpacked[name] = (self.unpacked_file.tell(), member.size)
+                shutil.copyfileobj(self.file.extractfile(member), self.unpacked_file)
+        return True
+
+
+def is_archive(path):
+    return os.path.isfile(path) and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
+
+
+def get_archive(path):
+    """Returns the opened archive, archives are opened once per process as long as they do not change.
+    Handles are not shared between processes, forked workers would share the file offsets of the parent."""
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _archives.get((os.getpid(), path))
+    if cached is None or cached[0] != key:
+        cached = (key, Archive(path))
+        _archives[(os.getpid(), path)] = cached
+    return cached[1]
+
+
+def select_archive_members(path, names):
+    """Marks the members of the archive which will be read, only those are unpacked from compressed tar archives."""
+    _selected_members.setdefault(path, set()).update(names)
+    return True
+
+
+def join_archive_path(archive_path, name):
+    return ARCHIVE_SEPARATOR.join([archive_path, name.strip('/')]).rstrip('/')
+
+
+def split_archive_path(path):
+    """Returns (archive path, member name) of paths into archives, the member name is empty for the archive itself.
+    Returns None for other paths."""
+    start = path.find(ARCHIVE_SEPARATOR)
+    while start >= 0:
+        if os.path.isfile(path[:start]):
+            return path[:start], path[start + len(ARCHIVE_SEPARATOR):].strip('/')
+        start = path.find(ARCHIVE_SEPARATOR, start + 1)
+    if is_archive(path):
+        return path, ''
+    return None
+
+
+def get_archive_name(path):
+    """Returns the file name of the archive without its extension."""
+    file_name = os.path.basename(path)
+    for extension in ARCHIVE_EXTENSIONS:
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+    return file_name
+
+
+def open_file(path):
+    """Opens the file or archive member for binary reading."""
+    archive_path = split_archive_path(path) if ARCHIVE_SEPARATOR in path else None
+    if archive_path is None:
+        return open(path, 'rb')
+    return get_archive(archive_path[0]).open(archive_path[1])
+
+
+def get_file_stat(path):
+    """Returns (mtime, size) of the file, archive members have the mtime of the archive."""
+    archive_path = split_archive_path(path) if ARCHIVE_SEPARATOR in path else None
+    if archive_path is None:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    return os.stat(archive_path[0]).st_mtime_ns, get_archive(archive_path[0]).sizes[archive_path[1]]
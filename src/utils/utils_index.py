@@ -0,0 +1,191 @@
+import os
+import re
+
+from .utils_files import get_sub_directories, split_archive_path, get_archive, join_archive_path, \
+    select_archive_members
+
+RESULT_FILE = 'result'
+META_FILE = 'meta'
+MODEL_CONFIG_FILE = 'model_config'
+
+
+class FileClassifier:
+    """Classifies file names with one alternation regex of all patterns of interest."""
+
+    def __init__(self, config):
+        # (kind, pattern) in the order of precedence
+        named_patterns = [(RESULT_FILE, pattern) for pattern in config.get_patterns_to_look_for()]
+        named_patterns.append((META_FILE, config.get_pattern('meta')))
+        named_patterns.append((MODEL_CONFIG_FILE, config.get_pattern('model_config')))
+
+        self.kinds = [kind for kind, _ in named_patterns]
+        self.regex = re.compile('|'.join('(?P<p{}>{})'.format(idx, pattern.pattern)
+                                         for idx, (_, pattern) in enumerate(named_patterns)))
+
+    def classify(self, file_name):
+        """Returns the kind of the file or None if the file is of no interest."""
+        match = self.regex.match(file_name)
+        if match is None:
+            return None
+        # the outer group closes last, so lastgroup is the name of the matched alternative
+        return self.kinds[int(match.lastgroup[1:])]
+
+
+class ModelIndex:
+    """Index of the files of a model, built by a single scan of the model directory."""
+
+    def __init__(self, path):
+        self.path = path
+        # run directories directly in the model directory
+        self.run_directories = []
+        # {run: {filename: path}}
+        self.files_per_run = dict()
+        # {filename: path}
+        self.meta_files = dict()
+        self.config_files = []
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def number_of_runs(self):
+        return len(self.run_directories)
+
+    def get_paths_per_run_of_name(self, runs=None):
+        """Returns a dict in the form of {filename: {run: path}}, optionally only of the given runs"""
+        files_per_run = {run: files for run, files in self.files_per_run.items() if runs is None or run in runs}
+        file_names = sorted({file_name for files in files_per_run.values() for file_name in files})
+        paths_per_run_of_file = {file_name: dict() for file_name in file_names}
+        for run, files in files_per_run.items():
+            for file_name, path in files.items():
+                paths_per_run_of_file[file_name][run] = path
+        return paths_per_run_of_file
+
+    def get_files_of_run(self, run):
+        return list(self.files_per_run.get(run, dict()).values())
+
+    def get_files_of_runs(self):
+        return [path for files in self.files_per_run.values() for path in files.values()]
+
+    def add_meta_file(self, path):
+        self.meta_files[os.path.basename(path)] = path
+
+    def __str__(self):
+        return "ModelIndex(path: {} | runs: {} | meta files: {} | config files: {})".format(
+            self.path, self.number_of_runs, len(self.meta_files), len(self.config_files))
+
+
+def scan_model(path, config, classifier=None):
+    """Scans the model directory once with os.scandir and returns its ModelIndex.
+    Result files are assigned to the closest parent directory matching the run pattern.
+    Paths into archives are indexed from the member list of the archive."""
+    if classifier is None:
+        classifier = FileClassifier(config)
+    archive_path = split_archive_path(path)
+    if archive_path is not None:
+        return scan_archive_model(path, config, classifier)
+    run_pattern = config.get_pattern('run_directory')
+    model_dir_pattern = config.get_pattern('model_directory')
+
+    index = ModelIndex(path)
+
+    def scan(directory, run):
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_run = run
+                if run_pattern.match(entry.name):
+                    sub_run = entry.name
+                    if directory == path:
+                        index.run_directories.append(entry.name)
+                scan(entry.path, sub_run)
+                continue
+
+            kind = classifier.classify(entry.name)
+            if kind == RESULT_FILE:
+                if run is not None:
+                    index.files_per_run.setdefault(run, dict())[entry.name] = entry.path
+            elif kind == META_FILE:
+                index.meta_files[entry.name] = entry.path
+            elif kind == MODEL_CONFIG_FILE:
+                if model_dir_pattern.match(os.path.basename(directory)):
+                    index.config_files.append(entry.path)
+
+    scan(path, None)
+    return index
+
+
+def scan_archive_model(path, config, classifier):
+    """Returns the ModelIndex of a model directory in an archive, the member names are matched like the entries of
+    scan_model. The indexed members are selected, other members, e.g. checkpoints, are never unpacked."""
+    run_pattern = config.get_pattern('run_directory')
+    model_dir_pattern = config.get_pattern('model_directory')
+    archive_path, model_name = split_archive_path(path)
+    archive = get_archive(archive_path)
+    prefix = model_name + '/' if model_name != '' else ''
+
+    index = ModelIndex(path)
+    index.run_directories = sorted(directory[len(prefix):] for directory in archive.directories
+                                   if directory.startswith(prefix) and '/' not in directory[len(prefix):] and
+                                   run_pattern.match(directory[len(prefix):]))
+
+    selected = []
+    for name in archive.names:
+        if not name.startswith(prefix):
+            continue
+        *directories, file_name = name[len(prefix):].split('/')
+        run = None
+        for directory in directories:
+            if run_pattern.match(directory):
+                run = directory
+
+        kind = classifier.classify(file_name)
+        if kind == RESULT_FILE:
+            if run is not None:
+                index.files_per_run.setdefault(run, dict())[file_name] = join_archive_path(archive_path, name)
+                selected.append(name)
+        elif kind == META_FILE:
+            index.meta_files[file_name] = join_archive_path(archive_path, name)
+            selected.append(name)
+        elif kind == MODEL_CONFIG_FILE:
+            parent = directories[-1] if len(directories) > 0 else os.path.basename(model_name)
+            if model_dir_pattern.match(parent):
+                index.config_files.append(join_archive_path(archive_path, name))
+                selected.append(name)
+    select_archive_members(archive_path, selected)
+    return index
+
+
+def get_archive_session_root(archive):
+    """Returns the directory of the session in the archive, the single top level directory if there is one."""
+    top_level = {name.split('/')[0] for name in archive.sizes.keys()}
+    if len(top_level) == 1 and next(iter(top_level)) in archive.directories:
+        return next(iter(top_level))
+    return ''
+
+
+def get_model_directories(path):
+    """Returns the model directories of the session, which may also be an archive or a directory in an archive.
+    Hidden directories, e.g. the csv cache, are no models."""
+    archive_path = split_archive_path(path)
+    if archive_path is None:
+        models = get_sub_directories(path)
+    else:
+        archive_path, root = archive_path
+        archive = get_archive(archive_path)
+        if root == '':
+            root = get_archive_session_root(archive)
+        prefix = root + '/' if root != '' else ''
+        models = [join_archive_path(archive_path, directory) for directory in archive.directories
+                  if directory.startswith(prefix) and directory != root and '/' not in directory[len(prefix):]]
+    return sorted(model for model in models if not os.path.basename(model).startswith('.'))
+
+
+def scan_session(path, config):
+    """Scans each model directory of the session once, returns a dict in the form of {model_path: ModelIndex}
+    The session may also be a zip or tar archive."""
+    classifier = FileClassifier(config)
+    return {model: scan_model(model, config, classifier) for model in get_model_directories(path)}
@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+TRACE_FORMATS = ['json', 'chrome']
+
+# instrumentation with open spans, used by span and record_read
+_active = None
+
+
+def get_peak_rss():
+    """Returns the peak resident set size of the process in bytes, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Instrumentation:
+    """Records spans around the stages of the reporter with wall time, files and bytes read, rows processed and
+    peak rss. Finished spans are passed to the callbacks and can be exported as json or chrome trace."""
+
+    def __init__(self, enabled=True, callbacks=None):
+        self.enabled = enabled
+        self.callbacks = list(callbacks) if callbacks is not None else []
+        # finished spans as dicts
+        self.spans = []
+        self._open_spans = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # worker processes record into an empty copy, callbacks stay in the parent
+        return {'enabled': self.enabled}
+
+    def __setstate__(self, state):
+        self.__init__(enabled=state['enabled'])
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Records the enclosed block as span with the given name."""
+        global _active
+        if not self.enabled:
+            yield None
+            return
+
+        span = {'name': name, 'attributes': attributes, 'pid': os.getpid(), 'tid': threading.get_ident(),
+                'start_us': time.time_ns() // 1000, 'files_read': 0, 'bytes_read': 0, 'rows': 0}
+        with self._lock:
+            self._open_spans.append(span)
+        previous, _active = _active, self
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span['seconds'] = time.perf_counter() - start
+            span['peak_rss_bytes'] = get_peak_rss()
+            _active = previous
+            with self._lock:
+                self._open_spans.remove(span)
+            self.add_spans([span])
+
+    def record(self, files=0, bytes_read=0, rows=0):
+        """Adds the counts to all open spans."""
+        with self._lock:
+            for span in self._open_spans:
+                span['files_read'] += files
+                span['bytes_read'] += bytes_read
+                span['rows'] += rows
+
+    def add_spans(self, spans):
+        """Adds finished spans, e.g. of worker processes, and passes them to the callbacks."""
+        self.spans.extend(spans)
+        for callback in self.callbacks:
+            for span in spans:
+                callback(span)
+
+    def export(self, path, trace_format='json'):
+        """Writes the finished spans as json or as chrome trace (chrome://tracing, perfetto)."""
+        if trace_format == 'json':
+            data = {'spans': self.spans}
+        elif trace_format == 'chrome':
+            data = {'traceEvents': [{'name': span['name'], 'cat': 'meta_reporter', 'ph': 'X',
+                                     'ts': span['start_us'], 'dur': int(span['seconds'] * 1e6),
+                                     'pid': span['pid'], 'tid': span['tid'],
+                                     'args': {**span['attributes'], 'files_read': span['files_read'],
+                                              'bytes_read': span['bytes_read'], 'rows': span['rows'],
+                                              'peak_rss_bytes': span['peak_rss_bytes']}}
+                                    for span in self.spans]}
+        else:
+            raise ValueError(f"'{trace_format}' is not specified as trace format.")
+
+        with open(path, 'w') as trace_file:
+            json.dump(data, trace_file, default=str)
+        return True
+
+
+def span(name, **attributes):
+    """Span of the active instrumentation, does nothing without an active instrumentation."""
+    if _active is None:
+        return nullcontext()
+    return _active.span(name, **attributes)
+
+
+def record_read(path, dataframe, bytes_read=None):
+    """Records the read of the file into the dataframe in the active instrumentation."""
+    if _active is None:
+        return
+    if bytes_read is None:
+        bytes_read = os.path.getsize(path)
+    _active.record(files=1, bytes_read=bytes_read, rows=len(dataframe))
+
+
+def traced(method):
+    """Decorator, records each call of the method as span of the instrumentation of the instance."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.instrumentation.span(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+from .utils_files import atomic_file_path, open_file, get_file_stat
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Returns the hash of the content of the file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open_file(path) as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_settings(settings):
+    """Returns the hash of json serializable settings."""
+    return hashlib.blake2b(json.dumps(settings, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+class Manifest:
+    """Fingerprints of the input files and the produced output files per key, stored as json file.
+    Files are only hashed if their mtime or size changed since they were fingerprinted the last time."""
+
+    def __init__(self, path):
+        self.path = path
+        # {key: {'settings': hash, 'inputs': {path: fingerprint}, 'outputs': [paths]}}
+        self.entries = dict()
+        if os.path.exists(path):
+            with open(path) as manifest_file:
+                self.entries = json.load(manifest_file)
+
+        # known fingerprints of all entries {path: {'mtime': mtime, 'size': size, 'hash': hash}}
+        self.fingerprints = dict()
+        for entry in self.entries.values():
+            self.fingerprints.update(entry['inputs'])
+
+    def fingerprint(self, paths):
+        """Returns the fingerprints of the files in the form of {path: {'mtime': mtime, 'size': size, 'hash': hash}}"""
+        fingerprints = dict()
+        for path in sorted(paths):
+            mtime, size = get_file_stat(path)
+            known = self.fingerprints.get(path)
+            if known is None or known['mtime'] != mtime or known['size'] != size:
+                known = {'mtime': mtime, 'size': size, 'hash': hash_file(path)}
+                self.fingerprints[path] = known
+            fingerprints[path] = known
+        return fingerprints
+
+    def is_up_to_date(self, key, inputs, settings):
+        """Checks if the inputs and settings did not change since the last update and all outputs exist."""
+        entry = self.entries.get(key)
+        if entry is None or entry['settings'] != settings:
+            return False
+
+        if {path: fingerprint['hash'] for path, fingerprint in entry['inputs'].items()} != \
+                {path: fingerprint['hash'] for path, fingerprint in inputs.items()}:
+            return False
+
+        return all(os.path.exists(output) for output in entry['outputs'])
+
+    def get_entry(self, key):
+        return self.entries.get(key)
+
+    def set_entry(self, key, entry):
+        self.entries[key] = entry
+        self.fingerprints.update(entry['inputs'])
+
+    def update(self, key, inputs, settings, outputs):
+        self.set_entry(key, {'settings': settings, 'inputs': inputs, 'outputs': sorted(set(outputs))})
+
+    def get_outputs(self, key):
+        entry = self.entries.get(key)
+        return entry['outputs'] if entry is not None else []
+
+    def save(self):
+        with atomic_file_path(self.path) as tmp_path:
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump(self.entries, manifest_file, indent=1)
+        return True
@@ -1,17 +1,110 @@
+import re
+import numpy as np
 import pandas as pd
-from .utils_files import generate_file_path
-from .utils_config import get_data_from_config
-from .utils import check_name, get_set_name
+from .utils_files import generate_file_path, atomic_file_path, split_archive_path, open_file, get_file_stat, \
+    ARCHIVE_SEPARATOR
+from .utils import get_set_name
+from .utils_instrumentation import record_read
+from .utils_aggregation import aggregate, merge_aggregates, flatten_aggregate, unflatten_aggregate, \
+    finalize_aggregate
 import os
 from functools import reduce
 
+# file extension per output format
+OUTPUT_FORMATS = {'csv': 'csv', 'parquet': 'parquet', 'feather': 'feather'}
+
+
+def read_csv(path, cache=None):
+    """Reads the csv file into a dataframe, through the cache (CsvCache or MemoryCache) if given.
+    Members of archives are streamed into the parser without cache."""
+    if ARCHIVE_SEPARATOR in path and split_archive_path(path) is not None:
+        with open_file(path) as file:
+            dataframe = pd.read_csv(file)
+        record_read(path, dataframe, bytes_read=get_file_stat(path)[1])
+        return dataframe
+
+    if cache is None:
+        dataframe = pd.read_csv(path)
+    else:
+        dataframe, path = cache.read(path)
+    # nothing was read for dataframes cached in memory
+    if path is not None:
+        record_read(path, dataframe)
+    return dataframe
+
+
+def get_file_format(path):
+    """Returns the output format of the file given by its extension, csv for unknown extensions."""
+    extension = os.path.splitext(path)[1][1:]
+    for file_format, format_extension in OUTPUT_FORMATS.items():
+        if extension == format_extension:
+            return file_format
+    return 'csv'
+
+
+def read_dataframe(path, cache=None):
+    """Reads a csv, parquet or feather file into a dataframe, the format is given by the file extension."""
+    file_format = get_file_format(path)
+    if file_format == 'parquet':
+        dataframe = pd.read_parquet(path)
+    elif file_format == 'feather':
+        # pyarrow is only needed for parquet and feather files
+        from pyarrow import feather
+        # uncompressed feather files are memory-mapped
+        dataframe = feather.read_table(path, memory_map=True).to_pandas()
+    else:
+        return read_csv(path, cache)
+    record_read(path, dataframe)
+    return dataframe
+
+
+def get_output_file_name(file_name, file_format='csv'):
+    """Replaces the extension of the file name with the one of the output format."""
+    if file_format not in OUTPUT_FORMATS:
+        raise ValueError(f"'{file_format}' is not specified as output format.")
+    return '.'.join([os.path.splitext(file_name)[0], OUTPUT_FORMATS[file_format]])
+
+
+def to_arrow_compatible(dataframe):
+    """Arrow needs one type per column, object columns with mixed types (e.g. lists and strings of the model
+    configs) are written as strings, like in the csv files."""
+    columns = [column for column in dataframe.columns if dataframe[column].dtype == object and
+               pd.api.types.infer_dtype(dataframe[column], skipna=True) not in ['string', 'empty', 'boolean']]
+    if len(columns) == 0:
+        return dataframe
+    dataframe = dataframe.copy()
+    for column in columns:
+        dataframe[column] = dataframe[column].map(lambda value: value if value is None or value is np.nan
+                                                  else str(value))
+    return dataframe
+
+
+def write_dataframe(dataframe, path, nan_representation='', compression=None, index=True, file_format=None):
+    """Writes the dataframe as csv, parquet or feather, by default the format is given by the file extension.
+    The index is written as first column in all formats. nan_representation is only used for csv, parquet and
+    feather keep missing values as nulls and the floats unchanged."""
+    if file_format is None:
+        file_format = get_file_format(path)
+    if file_format == 'csv':
+        dataframe.to_csv(path, na_rep=nan_representation, index=index, mode='w')
+        return True
+
+    if index:
+        dataframe = dataframe.reset_index()
+    dataframe = to_arrow_compatible(dataframe)
+    if file_format == 'parquet':
+        dataframe.to_parquet(path, index=False, compression=None if compression == 'uncompressed' else compression)
+    else:
+        dataframe.reset_index(drop=True).to_feather(path, compression=compression)
+    return True
+
 
-def generate_dataframe_per_key(paths_per_file, index_name, drop_rows):
+def generate_dataframe_per_key(paths_per_file, index_name, drop_rows, cache=None):
     """Generates dataframes per file name by concatenating the dataframes of each file."""
     file_dataframes = {file_name: None for file_name in paths_per_file.keys()}
     for file in paths_per_file.keys():
         files = paths_per_file[file]
-        file_data = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+        file_data = pd.concat([read_csv(f, cache) for f in files], ignore_index=True)
 
         file_data.set_index(list(file_data.columns)[0], inplace=True)
         file_data.index.set_names(index_name, inplace=True)
@@ -21,14 +114,14 @@ def generate_dataframe_per_key(paths_per_file, index_name, drop_rows):
     return file_dataframes
 
 
-def generate_dataframes_with_run(paths_per_run_of_file, index_name, drop_rows):
+def generate_dataframes_with_run(paths_per_run_of_file, index_name, drop_rows, cache=None):
     """Generates dataframes per filename, adds a column Run"""
     file_dataframes = {file_name: None for file_name in paths_per_run_of_file.keys()}
 
     for file_name, runs in paths_per_run_of_file.items():
         dataframes = []
         for run, file_path in runs.items():
-            dataframe = pd.read_csv(file_path)
+            dataframe = read_csv(file_path, cache)
             dataframe['Run'] = run.replace('run', '')
             dataframes.append(dataframe)
 
@@ -44,12 +137,77 @@ def generate_dataframes_with_run(paths_per_run_of_file, index_name, drop_rows):
     return file_dataframes
 
 
-def calculate(dataframes, group_by, metrics, drop_columns=[]):
-    """Calculates the given metrics of eacht column"""
+def sample_runs(number_of_runs, sampled_runs, seed=0):
+    """Returns the sorted positions of up to sampled_runs randomly chosen runs (reservoir sampling), the choice only
+    depends on the number of runs and the seed."""
+    rng = np.random.default_rng(seed)
+    sampled = []
+    for position in range(number_of_runs):
+        if len(sampled) < sampled_runs:
+            sampled.append(position)
+        elif sampled_runs > 0:
+            replace = rng.integers(0, position + 1)
+            if replace < sampled_runs:
+                sampled[replace] = position
+    return sorted(sampled)
+
+
+def generate_aggregates_with_run(paths_per_run_of_file, index_name, drop_rows, sampled_runs=0, cache=None,
+                                 seed=0):
+    """Reads the runs one at a time and merges their aggregates, only one run per file is kept in memory.
+    Returns the aggregates per filename and dataframes with column Run of up to sampled_runs randomly chosen runs
+    per filename (reservoir sampling), which can be used for plots."""
+    aggregates_per_file = {file_name: None for file_name in paths_per_run_of_file.keys()}
+    sampled_dataframes_per_file = {file_name: None for file_name in paths_per_run_of_file.keys()}
+
+    for file_name, runs in paths_per_run_of_file.items():
+        sampled_positions = set(sample_runs(len(runs), sampled_runs, seed))
+        sampled = []
+        for position, (run, file_path) in enumerate(runs.items()):
+            dataframe = read_csv(file_path, cache)
+            dataframe.set_index(list(dataframe.columns)[0], inplace=True)
+            dataframe.index.set_names(index_name, inplace=True)
+            dataframe.drop(index=drop_rows, inplace=True, errors='ignore')
+
+            aggregates_per_file[file_name] = merge_aggregates(aggregates_per_file[file_name],
+                                                              aggregate(dataframe, index_name))
+
+            if position in sampled_positions:
+                sampled.append(dataframe.assign(Run=run.replace('run', '')))
+
+        if len(sampled) > 0:
+            sampled_dataframes_per_file[file_name] = pd.concat(sampled)
+
+    return aggregates_per_file, sampled_dataframes_per_file
+
+
+def merge_partial_files(paths_per_file, metrics):
+    """Merges the partial aggregates of the files in the form of {filename: [paths]} in the given order.
+    Returns the merged partial aggregates and the calculated metrics per filename."""
+    partial_per_file = {file_name: None for file_name in paths_per_file.keys()}
+    calculated_per_file = {file_name: None for file_name in paths_per_file.keys()}
+    for file_name, paths in paths_per_file.items():
+        state = None
+        for path in paths:
+            dataframe = read_dataframe(path)
+            dataframe.set_index(list(dataframe.columns)[0], inplace=True)
+            state = merge_aggregates(state, unflatten_aggregate(dataframe))
+        partial_per_file[file_name] = flatten_aggregate(state)
+        calculated_per_file[file_name] = finalize_aggregate(state, metrics)
+    return partial_per_file, calculated_per_file
+
+
+def calculate(dataframes, group_by, metrics, drop_columns=[], partial=False):
+    """Calculates the given metrics of eacht column.
+    With partial, the mergeable aggregates (count, mean, m2, min, max) of each column are returned instead, they can
+    be written and merged with merge_partial_files."""
     calculated = {name: None for name in dataframes.keys()}
     for name, df in dataframes.items():
         columns = [column for column in df.columns if column not in drop_columns]
         df = df[columns]
+        if partial:
+            calculated[name] = flatten_aggregate(aggregate(df, group_by))
+            continue
         grouped_file_data = df.groupby(group_by, group_keys=False, as_index=True, sort=False)
         # calculate stats
         aggregated = grouped_file_data.agg(metrics)
@@ -62,62 +220,142 @@ def calculate(dataframes, group_by, metrics, drop_columns=[]):
     return calculated
 
 
-def dataframes_to_csv(path, dataframes_per_file, output_file_names, nan_representation):
-    """Writes each dataframe into a csv"""
+def dataframes_to_files(path, dataframes_per_file, output_file_names, nan_representation, compression=None):
+    """Writes each dataframe into a file, the format is given by the extension of the output file name"""
     for df_name, name in zip(dataframes_per_file, output_file_names):
-        dataframes_per_file[df_name].to_csv(generate_file_path(path, name), na_rep=nan_representation, mode='w')
+        write_dataframe(dataframes_per_file[df_name], generate_file_path(path, name), nan_representation,
+                        compression)
     return True
 
 
-def generate_dataframe_of_file_per_model(models, files_per_model, drop_rows, config_path):
+def generate_dataframe_of_file_per_model(models, files_per_model, drop_rows, config, cache=None):
     """Generates one dataframe for each file per model.
     Return dict of the form {model_path: {filename: dataframe}}"""
-    group_column = get_data_from_config("class_column_name", path=config_path)
+    group_column = config.get("class_column_name")
     dataframes_of_models = {model: dict() for model in models}
     for model, path_per_file_name in files_per_model.items():
         for file_name, file_path in path_per_file_name.items():
-            dataframe = pd.read_csv(file_path)
+            dataframe = read_dataframe(file_path, cache)
             dataframe.drop(index=drop_rows, inplace=True, errors='ignore')
             dataframe.set_index(group_column, inplace=True)
             dataframes_of_models[model][file_name] = dataframe
     return dataframes_of_models
 
 
-def write_session_meta_result(df, result_file, nan_representation, subset):
-    """Writes the result of the session to the specified file, appends if file exists already"""
+def write_session_meta_result(df, result_file, nan_representation, subset, compression=None):
+    """Writes the result of the session to the specified file, appends if file exists already.
+    New entries replace existing entries with the same subset, the file is replaced atomically.
+    The format is given by the file extension."""
     if os.path.exists(result_file):
-        existing_df = pd.read_csv(result_file)
-        df = existing_df.append(df, ignore_index=True)
-        df.drop_duplicates(subset=subset, inplace=True)
-    df.to_csv(result_file, mode="w", index=False, header=True, na_rep=nan_representation)
+        existing_df = read_dataframe(result_file)
+        df = pd.concat([existing_df, df], ignore_index=True)
+        df.drop_duplicates(subset=subset, keep='last', inplace=True)
+    with atomic_file_path(result_file) as tmp_path:
+        write_dataframe(df, tmp_path, nan_representation, compression, index=False,
+                        file_format=get_file_format(result_file))
     return True
 
 
-def generate_summary_dataframe_of_model(dataframes, config_path, session_metrics, data):
-    """Generates a dataframe which contains all information about the model"""
+def generate_summary_dataframe_of_model(dataframes, config, session_metrics, data):
+    """Generates a dataframe which contains all information about the model.
+    The columns of the session metrics are selected once per file and their values are flattened at once."""
+    metric_regex = re.compile(".+_(?:{})".format("|".join(session_metrics)))
+    row = dict(data)
     for file_name, dataframe in dataframes.items():
 
-        set_name = get_set_name(file_name, config_path)
-        if set_name is not None:
-            # create columns
-            columns = [col for col in dataframe.columns if any([check_name(col, "".join([".+_", metric])) for metric in
-                                                                session_metrics])]
-            for column in columns:
-                # add value into data
-                for clazz in dataframe.index.values:
-                    column_name = "_".join([set_name, column, clazz])
-                    data[column_name] = [dataframe.loc[clazz, column]]
-
-    df = pd.DataFrame(data=data)
+        set_name = get_set_name(file_name, config)
+        if set_name is None:
+            continue
+
+        columns = [col for col in dataframe.columns if metric_regex.match(col)]
+        if len(columns) == 0:
+            continue
+
+        # series with index (column, class), ordered by column
+        values = dataframe[columns].unstack()
+        column_names = set_name + '_' + values.index.get_level_values(0).astype(str) + '_' + \
+            values.index.get_level_values(1).astype(str)
+        row.update(zip(column_names, values.to_numpy()))
+
+    df = pd.DataFrame([row])
     return df
 
 
+def generate_long_summary_dataframe(dataframes, config, statistics):
+    """Reshapes the meta dataframes of a model, whose columns are named <metric>_<statistic>, into one row per set,
+    class, metric and statistic. Files without set are skipped like in the summary."""
+    statistic_regex = re.compile("^(.+)_({})$".format("|".join(statistics)))
+    long_dfs = []
+    for file_name, dataframe in dataframes.items():
+        set_name = get_set_name(file_name, config)
+        if set_name is None:
+            continue
+
+        matches = {col: statistic_regex.match(col) for col in dataframe.columns}
+        columns = [col for col, match in matches.items() if match]
+        if len(columns) == 0:
+            continue
+
+        values = dataframe[columns].unstack()
+        long_dfs.append(pd.DataFrame({'set': set_name,
+                                      'class': values.index.get_level_values(1).astype(str),
+                                      'metric': [matches[col].group(1) for col in values.index.get_level_values(0)],
+                                      'statistic': [matches[col].group(2) for col in values.index.get_level_values(0)],
+                                      'value': values.to_numpy()}))
+
+    if len(long_dfs) == 0:
+        return pd.DataFrame(columns=['set', 'class', 'metric', 'statistic', 'value'])
+    return pd.concat(long_dfs, ignore_index=True)
+
+
+def generate_long_dataframe(dataframe, identifiers, class_column='class', metric_column='metric',
+                            value_column='value'):
+    """Reshapes the dataframe, whose first column contains the classes, into one row per value.
+    The identifiers {column: value} are added as columns in front."""
+    long_df = dataframe.melt(id_vars=dataframe.columns[0], var_name=metric_column, value_name=value_column)
+    long_df.rename(columns={dataframe.columns[0]: class_column}, inplace=True)
+    long_df[class_column] = long_df[class_column].astype(str)
+    for position, (column, value) in enumerate(identifiers.items()):
+        long_df.insert(position, column, value)
+    return long_df
+
+
+def concat_long_dataframes(long_dfs, identifier_columns, class_column='class', metric_column='metric',
+                           value_column='value'):
+    """Concatenates long dataframes, returns an empty long dataframe if there are none."""
+    if len(long_dfs) == 0:
+        return pd.DataFrame(columns=[*identifier_columns, class_column, metric_column, value_column])
+    return pd.concat(long_dfs, ignore_index=True)
+
+
+def long_to_wide_dataframe(long_df, index_column, index_values, set_column='set', class_column='class',
+                           metric_column='metric', value_column='value'):
+    """Pivots the long dataframe into one row per index value and one column named set_metric_class per value.
+    Columns keep the order of their first appearance, the last value wins for duplicates."""
+    keys = long_df[set_column] + '_' + long_df[metric_column] + '_' + long_df[class_column]
+    long_df = long_df[[index_column, value_column]].assign(key=keys)
+    long_df = long_df.drop_duplicates(subset=[index_column, 'key'], keep='last')
+
+    wide_df = long_df.pivot(index=index_column, columns='key', values=value_column)
+    wide_df = wide_df.reindex(index=pd.Index(index_values, name=index_column), columns=pd.unique(keys))
+    wide_df.columns.name = None
+    return wide_df
+
+
 def get_interval_index_of_value(interval, value):
     """Returns the interval index of the given intervals, in which the value is present."""
     matched_intervals = [idx for idx, x in enumerate(interval.contains(value)) if x]
     return matched_intervals[0] if len(matched_intervals) > 0 else 0
 
 
+def get_interval_indices_of_values(breaks, values):
+    """Returns the index of the right closed interval (breaks[i], breaks[i + 1]] of each value,
+    0 for values outside of all intervals."""
+    indices = np.searchsorted(breaks, values, side='left') - 1
+    indices[(indices < 0) | (indices >= len(breaks) - 1)] = 0
+    return indices
+
+
 def add_run_to_column_names(dataframes_per_file, run_column='Run'):
     """Add the run, given as Series in the Dataframe, to the column names -> dataframe is reshaped"""
     dataframes_per_files_with_run = {file_name: None for file_name in dataframes_per_file.keys()}
@@ -0,0 +1,107 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+class Prefetcher:
+    """Reads csv files on a thread pool ahead of their use, while the files read before are processed.
+    Prefetched files are read in the given order, at most depth of them are read or wait to be used, which bounds
+    the memory. Reads go through the parent cache (e.g. a CsvCache) if given, files which are not prefetched are read
+    when they are needed. Files may be used in any order, prefetched files which will not be used have to be
+    discarded, otherwise they hold a place in the pipeline until clear."""
+
+    def __init__(self, parent=None, workers=4, depth=8):
+        if workers < 1 or depth < 1:
+            raise ValueError(f"Prefetching needs at least one worker and a depth of one, got workers {workers} and "
+                             f"depth {depth}.")
+        self.parent = parent
+        self.workers = workers
+        self.depth = depth
+        # the threads are started with the first prefetch
+        self.executor = None
+        # paths which are not submitted yet
+        self.queued = deque()
+        # submitted reads in the form of [(path, future)]
+        self.submitted = deque()
+        # queued and submitted paths
+        self.pending = set()
+
+    def __getstate__(self):
+        # worker processes start with an empty pipeline
+        return {'parent': self.parent, 'workers': self.workers, 'depth': self.depth}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_file(self, path):
+        if self.parent is not None:
+            return self.parent.read(path)
+        return pd.read_csv(path), path
+
+    def prefetch(self, paths):
+        """Appends the paths to the pipeline, paths which are already pending are not added again."""
+        for path in paths:
+            if path not in self.pending:
+                self.queued.append(path)
+                self.pending.add(path)
+        self.submit()
+        return True
+
+    def submit(self):
+        if len(self.queued) > 0 and self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prefetch')
+        while len(self.queued) > 0 and len(self.submitted) < self.depth:
+            path = self.queued.popleft()
+            self.submitted.append((path, self.executor.submit(self.read_file, path)))
+
+    def take(self, path):
+        """Removes the path from the pipeline, returns its future if its read was submitted."""
+        self.pending.remove(path)
+        for position, (submitted_path, future) in enumerate(self.submitted):
+            if submitted_path == path:
+                del self.submitted[position]
+                return future
+        self.queued.remove(path)
+        return None
+
+    def read(self, path):
+        """Returns the dataframe of the csv file and the path of the file it was read from."""
+        if path not in self.pending:
+            return self.read_file(path)
+
+        future = self.take(path)
+        # the place of the path is given to the next queued path
+        self.submit()
+        if future is None:
+            return self.read_file(path)
+        return future.result()
+
+    def discard(self, paths):
+        """Removes the paths from the pipeline, e.g. the files of a skipped model. Reads which did not start yet
+        are cancelled."""
+        for path in paths:
+            if path in self.pending:
+                future = self.take(path)
+                if future is not None:
+                    future.cancel()
+        self.submit()
+        return True
+
+    def clear(self):
+        """Discards all pending entries."""
+        return self.discard(list(self.pending))
+
+    def close(self):
+        """Discards all pending entries and stops the threads, a later prefetch starts new ones."""
+        self.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        return True
@@ -0,0 +1,148 @@
+import json
+import os
+import socket
+import time
+import uuid
+
+from .utils_files import atomic_file_path
+
+JOB_FILE = 'json'
+LOCK_FILE = 'lock'
+DONE_FILE = 'done'
+FAILED_FILE = 'failed'
+
+PENDING = 'pending'
+LOCKED = 'locked'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """Queue of jobs in a directory, which may be shared by several hosts. A job is claimed by creating its lock file
+    exclusively, the holder touches the lock while the job is running. Locks which were not touched for
+    lock_timeout seconds are abandoned and can be claimed again.
+    The files of a job are <id>.json (the job), <id>.lock, <id>.done and <id>.failed (the error)."""
+
+    def __init__(self, directory, lock_timeout=600):
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def get_file(self, job_id, kind):
+        return os.path.join(self.directory, '.'.join([job_id, kind]))
+
+    def add(self, job):
+        """Adds the job if it is not in the queue yet, returns if it was added."""
+        if os.path.exists(self.get_file(job['id'], JOB_FILE)):
+            return False
+        self.update(job)
+        return True
+
+    def update(self, job):
+        with atomic_file_path(self.get_file(job['id'], JOB_FILE)) as tmp_path:
+            with open(tmp_path, 'w') as job_file:
+                json.dump(job, job_file)
+        return True
+
+    def get(self, job_id):
+        with open(self.get_file(job_id, JOB_FILE)) as job_file:
+            return json.load(job_file)
+
+    def get_state(self, job_id):
+        if os.path.exists(self.get_file(job_id, DONE_FILE)):
+            return DONE
+        if os.path.exists(self.get_file(job_id, FAILED_FILE)):
+            return FAILED
+        if os.path.exists(self.get_file(job_id, LOCK_FILE)) and not self.is_abandoned(job_id):
+            return LOCKED
+        return PENDING
+
+    def is_abandoned(self, job_id):
+        try:
+            return time.time() - os.path.getmtime(self.get_file(job_id, LOCK_FILE)) > self.lock_timeout
+        except FileNotFoundError:
+            return False
+
+    def claim(self, job_id):
+        """Locks the job for this process, returns False if it is locked, done or failed already."""
+        lock_file = self.get_file(job_id, LOCK_FILE)
+        if self.is_abandoned(job_id):
+            self.take_over(job_id)
+
+        token = uuid.uuid4().hex
+        try:
+            descriptor = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump({'host': socket.gethostname(), 'pid': os.getpid(), 'time': time.time(), 'token': token}, file)
+
+        # the lock has to be ours, it is not if it was moved away by a concurrent take over
+        try:
+            with open(lock_file) as file:
+                if json.load(file).get('token') != token:
+                    return False
+        except (FileNotFoundError, ValueError):
+            return False
+
+        # the job may have been finished by another host in the meantime
+        if self.get_state(job_id) in [DONE, FAILED]:
+            self.release(job_id)
+            return False
+        return True
+
+    def take_over(self, job_id):
+        """Moves an abandoned lock out of the way. The lock is renamed to a unique name, which only one process
+        can do, and put back if it is not abandoned, e.g. because another host took it over in the meantime."""
+        lock_file = self.get_file(job_id, LOCK_FILE)
+        stale_file = '.'.join([lock_file, uuid.uuid4().hex, 'stale'])
+        try:
+            os.rename(lock_file, stale_file)
+        except FileNotFoundError:
+            return False
+
+        if time.time() - os.path.getmtime(stale_file) > self.lock_timeout:
+            os.remove(stale_file)
+            return True
+        try:
+            # fails if the lock was created again since the rename
+            os.link(stale_file, lock_file)
+        except FileExistsError:
+            pass
+        os.remove(stale_file)
+        return False
+
+    def heartbeat(self, job_id):
+        """Keeps the lock of a running job alive."""
+        try:
+            os.utime(self.get_file(job_id, LOCK_FILE))
+        except FileNotFoundError:
+            pass
+
+    def release(self, job_id):
+        try:
+            os.remove(self.get_file(job_id, LOCK_FILE))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, job_id):
+        with open(self.get_file(job_id, DONE_FILE), 'w') as file:
+            file.write(socket.gethostname())
+        self.release(job_id)
+
+    def fail(self, job_id, error):
+        with open(self.get_file(job_id, FAILED_FILE), 'w') as file:
+            file.write(error)
+        self.release(job_id)
+
+    def get_error(self, job_id):
+        with open(self.get_file(job_id, FAILED_FILE)) as file:
+            return file.read()
+
+    def clear(self):
+        """Removes all jobs, e.g. to run a finished batch again."""
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and os.path.splitext(entry.name)[1][1:] in [JOB_FILE, LOCK_FILE, DONE_FILE,
+                                                                           FAILED_FILE]:
+                os.remove(entry.path)
+        return True
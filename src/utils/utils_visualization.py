@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+
+
 def get_color_map(colors, keys):
     """Returns a map in the form of {key: color}"""
     color_map = dict()
@@ -5,3 +9,52 @@ def get_color_map(colors, keys):
         if key not in color_map:
             color_map[key] = colors[idx % len(colors)]
     return color_map
+
+
+SAMPLING_METHODS = ['reservoir', 'quantile']
+# sampling method of the violin plots, also the one of the default config
+DEFAULT_SAMPLING_METHOD = 'quantile'
+
+
+def sample_values(values, max_points, method=DEFAULT_SAMPLING_METHOD, seed=0):
+    """Returns at most max_points of the values, NaN values are removed.
+    'reservoir' draws a deterministic uniform sample and keeps the order of the values,
+    'quantile' takes the values at evenly spaced ranks and keeps the shape of the distribution."""
+    values = np.asarray(values)
+    values = values[~pd.isna(values)]
+    if max_points is None or len(values) <= max_points:
+        return values
+
+    if method == 'reservoir':
+        rng = np.random.default_rng(seed)
+        return values[np.sort(rng.choice(len(values), size=max_points, replace=False))]
+    elif method == 'quantile':
+        positions = np.linspace(0, len(values) - 1, max_points).round().astype(int)
+        return np.sort(values)[positions]
+    else:
+        raise ValueError(f"'{method}' is not specified as sampling method.")
+
+
+def gaussian_kde(values, points=100, chunk_size=10000):
+    """Returns the grid and the gaussian kernel density of the values, NaN values are ignored.
+    The bandwidth follows Silverman's rule and the grid spans two bandwidths beyond the values like the soft span
+    of plotly violins."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([]), np.array([])
+
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = min(values.std(ddof=1) if len(values) > 1 else 0, (q3 - q1) / 1.349)
+    bandwidth = 1.059 * spread * len(values) ** -0.2
+    if bandwidth <= 0:
+        # constant values
+        bandwidth = abs(values[0]) * 0.01 or 0.01
+
+    grid = np.linspace(values.min() - 2 * bandwidth, values.max() + 2 * bandwidth, points)
+    density = np.zeros(points)
+    for start in range(0, len(values), chunk_size):
+        distances = (grid[:, None] - values[None, start:start + chunk_size]) / bandwidth
+        density += np.exp(-0.5 * distances ** 2).sum(axis=1)
+    density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+    return grid, density
@@ -0,0 +1,224 @@
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version, PackageNotFoundError
+
+HTML_FORMAT = 'html'
+STATIC_FORMATS = ['pdf', 'svg', 'png', 'jpg', 'jpeg']
+HTML_MODES = ['standalone', 'shared', 'dashboard']
+
+# same name plotly uses for include_plotlyjs='directory'
+PLOTLYJS_FILE_NAME = 'plotly.min.js'
+
+DASHBOARD_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 1em 2em; }}
+.figure {{ min-height: 450px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<nav>{navigation}</nav>
+{sections}
+<script>
+// figures are plotted when they scroll into view
+const observer = new IntersectionObserver(function (entries) {{
+    entries.forEach(function (entry) {{
+        if (!entry.isIntersecting) {{
+            return;
+        }}
+        const element = entry.target;
+        observer.unobserve(element);
+        const figure = JSON.parse(document.getElementById(element.dataset.figure).textContent);
+        Plotly.newPlot(element, figure.data, figure.layout, {{responsive: true}});
+    }});
+}}, {{rootMargin: '500px'}});
+document.querySelectorAll('.figure').forEach(function (element) {{
+    observer.observe(element);
+}});
+</script>
+</body>
+</html>
+"""
+
+DASHBOARD_SECTION = """<section id="{id}">
+<h2>{name}</h2>
+<div class="figure" data-figure="{id}-json"></div>
+<script type="application/json" id="{id}-json">{figure_json}</script>
+</section>"""
+
+
+def has_batch_renderer():
+    """write_images renders many figures in one browser session, it needs plotly>=6.1 and kaleido>=1."""
+    import plotly.io as pio
+    if not hasattr(pio, 'write_images'):
+        return False
+    try:
+        return int(version('kaleido').split('.')[0]) >= 1
+    except PackageNotFoundError:
+        return False
+
+
+def write_html(figure, file, include_plotlyjs=True):
+    figure.write_html(file=file, include_plotlyjs=include_plotlyjs)
+
+
+def write_plotlyjs(directory):
+    """Writes the plotly.js bundle into the directory once, returns its path."""
+    from plotly.offline import get_plotlyjs
+    path = os.path.join(directory, PLOTLYJS_FILE_NAME)
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as plotlyjs_file:
+            plotlyjs_file.write(get_plotlyjs())
+    return path
+
+
+def write_dashboard(file, title, figures_per_name):
+    """Writes one html page with all figures {name: figure}, which loads the shared plotly.js bundle of its
+    directory. The figure json is embedded and only parsed and plotted when the figure scrolls into view."""
+    import plotly.io as pio
+    write_plotlyjs(os.path.dirname(file))
+
+    sections = []
+    for idx, (name, figure) in enumerate(figures_per_name.items()):
+        # '</' would end the script element
+        figure_json = pio.to_json(figure, validate=False).replace('</', '<\\/')
+        sections.append(DASHBOARD_SECTION.format(id='figure{}'.format(idx), name=html.escape(name),
+                                                 figure_json=figure_json))
+
+    navigation = ' | '.join('<a href="#figure{}">{}</a>'.format(idx, html.escape(name))
+                            for idx, name in enumerate(figures_per_name))
+    with open(file, 'w', encoding='utf-8') as dashboard_file:
+        dashboard_file.write(DASHBOARD_PAGE.format(title=html.escape(title), plotlyjs=PLOTLYJS_FILE_NAME,
+                                                   navigation=navigation, sections='\n'.join(sections)))
+    return file
+
+
+def render_images(figures, files):
+    """Renders the figures (or their dicts) into the files with one renderer.
+    kaleido<1 keeps its renderer alive between calls, kaleido>=1 renders the whole batch at once."""
+    import plotly.io as pio
+    if has_batch_renderer():
+        pio.write_images(figures, files)
+    else:
+        for figure, file in zip(figures, files):
+            pio.write_image(figure, file)
+    return files
+
+
+class PlotExporter:
+    """Queue for the export of plots. The figures are collected and rendered in one batch by export, static
+    images are rendered by a persistent renderer per worker process.
+    html_mode 'standalone' embeds plotly.js in each html file, 'shared' writes plotly.js once per directory and
+    'dashboard' writes all html figures of one export into a single page.
+    With more than one worker, the renderer processes are started with the first export and kept until close."""
+
+    def __init__(self, workers=1, fallback_to_html=False, html_mode='standalone'):
+        if html_mode not in HTML_MODES:
+            raise ValueError(f"'{html_mode}' is not specified as html mode.")
+        self.workers = workers
+        self.fallback_to_html = fallback_to_html
+        self.html_mode = html_mode
+        # [(figure, file_path, file_format)]
+        self.queue = []
+        # renderer processes, started on first use
+        self.executor = None
+
+    def __getstate__(self):
+        # the renderer processes are not shared with other processes
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the renderer processes, a later export starts new ones."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        return True
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def add(self, figure, file_path, file_format):
+        """Adds the figure to the queue, file_path is without file extension."""
+        if file_format != HTML_FORMAT and file_format not in STATIC_FORMATS:
+            raise ValueError(f"'{file_format}' is not specified as file format.")
+        self.queue.append((figure, file_path, file_format))
+
+    def export(self, dashboard_name='plots'):
+        """Writes all figures of the queue, returns the written files.
+        In dashboard mode, the html figures are written to dashboard_<dashboard_name>.html"""
+        queue, self.queue = self.queue, []
+
+        written_files = []
+        html_jobs = [(figure, file_path) for figure, file_path, file_format in queue if file_format == HTML_FORMAT]
+        static_jobs = [job for job in queue if job[2] != HTML_FORMAT]
+
+        if len(static_jobs) > 0:
+            # split jobs into one batch per worker
+            number_of_batches = max(1, min(self.workers, len(static_jobs)))
+            batches = [static_jobs[idx::number_of_batches] for idx in range(number_of_batches)]
+
+            if number_of_batches > 1:
+                executor = self.get_executor()
+                futures = [executor.submit(render_images, [figure.to_dict() for figure, _, _ in batch],
+                                           ['.'.join([path, file_format]) for _, path, file_format in batch])
+                           for batch in batches]
+                for batch, future in zip(batches, futures):
+                    written_files.extend(self.render_or_fallback(future.result, batch, html_jobs))
+            else:
+                written_files.extend(self.render_or_fallback(
+                    lambda: render_images([figure for figure, _, _ in static_jobs],
+                                          ['.'.join([path, file_format]) for _, path, file_format in static_jobs]),
+                    static_jobs, html_jobs))
+
+        written_files.extend(self.write_html_files(html_jobs, dashboard_name))
+        return written_files
+
+    def render_or_fallback(self, render, batch, html_jobs):
+        """Returns the rendered files. If rendering fails and fallback is enabled, the figures of the batch are added
+        to the html jobs instead."""
+        try:
+            return render()
+        except Exception:
+            if not self.fallback_to_html:
+                raise
+
+        html_jobs.extend((figure, file_path) for figure, file_path, _ in batch)
+        return []
+
+    def write_html_files(self, html_jobs, dashboard_name):
+        """Writes the html jobs [(figure, file_path)] according to the html mode, returns the written files."""
+        if len(html_jobs) == 0:
+            return []
+
+        if self.html_mode == 'dashboard':
+            directory = os.path.dirname(html_jobs[0][1])
+            file = os.path.join(directory, '.'.join(['_'.join(['dashboard', dashboard_name]), HTML_FORMAT]))
+            figures_per_name = {os.path.basename(file_path): figure for figure, file_path in html_jobs}
+            return [write_dashboard(file, dashboard_name, figures_per_name),
+                    os.path.join(directory, PLOTLYJS_FILE_NAME)]
+
+        # 'directory' references plotly.min.js next to the file and writes it if it is missing
+        include_plotlyjs = 'directory' if self.html_mode == 'shared' else True
+        files = []
+        for figure, file_path in html_jobs:
+            write_html(figure, '.'.join([file_path, HTML_FORMAT]), include_plotlyjs)
+            files.append('.'.join([file_path, HTML_FORMAT]))
+            if self.html_mode == 'shared':
+                files.append(os.path.join(os.path.dirname(file_path), PLOTLYJS_FILE_NAME))
+        return sorted(set(files), key=files.index)
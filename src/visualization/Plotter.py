@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from ..utils.utils_files import generate_file_path
+from ..utils.utils_instrumentation import span
 
 
 class Plotter(ABC):
@@ -20,13 +21,16 @@ class Plotter(ABC):
         """Generates and returns the plot."""
         pass
 
-    def save_as(self, file_format):
-        """Saves the plot in the given format."""
-        if file_format == 'html':
-            """html files are interactive"""
-            self.figure.write_html(file=generate_file_path(self.result_path, '.'.join([self.file_name, "html"])))
-        elif file_format in ['pdf', 'svg', 'png', 'jpg', 'jpeg']:
-            self.figure.write_image(
-                file=generate_file_path(self.result_path, '.'.join([self.file_name, file_format])))
-        else:
-            raise ValueError(f"'{file_format}' is not specified as file format.")
+    def save_as(self, file_format, exporter=None):
+        """Saves the plot in the given format. With an exporter the plot is queued and written by exporter.export."""
+        with span('save_as', file_name=self.file_name, file_format=file_format, queued=exporter is not None):
+            if exporter is not None:
+                exporter.add(self.figure, generate_file_path(self.result_path, self.file_name), file_format)
+            elif file_format == 'html':
+                """html files are interactive"""
+                self.figure.write_html(file=generate_file_path(self.result_path, '.'.join([self.file_name, "html"])))
+            elif file_format in ['pdf', 'svg', 'png', 'jpg', 'jpeg']:
+                self.figure.write_image(
+                    file=generate_file_path(self.result_path, '.'.join([self.file_name, file_format])))
+            else:
+                raise ValueError(f"'{file_format}' is not specified as file format.")
@@ -1,9 +1,55 @@
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
-from colour import Color
 import plotly.graph_objs as go
 
 from .Plotter import Plotter
-from ..utils.utils_pandas import get_interval_index_of_value
+from ..utils.utils_pandas import get_interval_indices_of_values
+
+# number of equally sized color buckets between lower and upper bound
+MID_PERIODS = 15
+# (lower_bound, upper_bound) of the buckets
+BUCKET_BOUNDS = (0.3, 0.9)
+STD_BUCKET_BOUNDS = (0.05, 0.1)
+
+
+@lru_cache(maxsize=None)
+def get_bucket_breaks(lower_bound, upper_bound, mid_periods):
+    """Returns the breaks of the right closed buckets (0, lower_bound], mid_periods buckets in
+    (lower_bound, upper_bound] and (upper_bound, 1]"""
+    intervals = pd.interval_range(lower_bound, upper_bound, periods=mid_periods, closed='right')
+    return np.array([0, *intervals.left, intervals.right[-1], 1])
+
+
+@lru_cache(maxsize=None)
+def get_bucket_colors(mid_periods):
+    """Returns the hex colors of the buckets from low (red) to high (dark green)."""
+    from colour import Color
+
+    color_low = Color('#e60000')  # red
+    color_lower_bound = Color('#ffa31a')  # orange
+    color_upper_bound = Color('#248f24')  # green
+    color_mid = Color('#ffcc00')  # yellow
+    color_high = Color('#006622')  # dark green
+
+    colors = list(color_lower_bound.range_to(color_mid, (mid_periods // 2) if mid_periods % 2 == 0 else (
+            mid_periods // 2 + 1)))
+    colors.extend(
+        list(color_mid.range_to(color_upper_bound, mid_periods // 2 + 1)))  # +1 because first one has to be deleted
+
+    # get unique hex values of colors
+    unique_colors = []
+    for color in colors:
+        if color.hex in unique_colors:
+            continue
+        else:
+            unique_colors.append(color.hex)
+
+    colors = [color_low.hex]
+    colors.extend(unique_colors)
+    colors.append(color_high.hex)
+    return np.array(colors)
 
 
 class TablePlotter(Plotter):
@@ -18,81 +64,26 @@ class TablePlotter(Plotter):
         columns.sort(key=lambda x: 'std' in x)
         self.dataframe = self.dataframe[columns]
 
-        # create intervals for coloring
-        # ---- interval 1 for all but std
-        closed_on = 'right'
-        lower_bound = 0.3
-        upper_bound = 0.9
-        mid_periods = 15
-
-        intervals1 = pd.IntervalIndex.from_breaks([0, lower_bound], closed=closed_on)
-        intervals2 = pd.interval_range(lower_bound, upper_bound, periods=mid_periods, closed=closed_on)
-        intervals3 = pd.IntervalIndex.from_breaks([upper_bound, 1], closed=closed_on)
-
-        interval_list_1 = intervals1.append([intervals2, intervals3])
-
-        # ---- interval 2 for std
-        closed_on = 'right'
-        lower_bound = 0.05
-        upper_bound = 0.1
-        mid_periods = 15
-
-        intervals1 = pd.IntervalIndex.from_breaks([0, lower_bound], closed=closed_on)
-        intervals2 = pd.interval_range(lower_bound, upper_bound, periods=mid_periods, closed=closed_on)
-        intervals3 = pd.IntervalIndex.from_breaks([upper_bound, 1], closed=closed_on)
-
-        interval_list_2 = intervals1.append([intervals2, intervals3])
-
-        # interval matrix, exclude first column (Class)
-        interval_dataframe = self.dataframe.iloc[:, 1:]
-        for column in self.dataframe.select_dtypes(exclude=['object']):
-            if 'std' in column:
-                interval_list = interval_list_2
-            else:
-                interval_list = interval_list_1
-
-            interval_dataframe[column] = self.dataframe[column].map(
-                lambda value: get_interval_index_of_value(interval_list, value))
-
-        # colors
-        color_low = Color('#e60000')  # red
-        color_lower_bound = Color('#ffa31a')  # orange
-        color_upper_bound = Color('#248f24')  # green
-        color_mid = Color('#ffcc00')  # yellow
-        color_high = Color('#006622')  # dark green
-
-        colors = list(color_lower_bound.range_to(color_mid, (mid_periods // 2) if mid_periods % 2 == 0 else (
-                mid_periods // 2 + 1)))
-        colors.extend(
-            list(color_mid.range_to(color_upper_bound, mid_periods // 2 + 1)))  # +1 because first one has to be deleted
-
-        # get unique hex values of colors
-        unique_colors = []
-        for color in colors:
-            if color.hex in unique_colors:
-                continue
-            else:
-                unique_colors.append(color.hex)
-
-        colors = [color_low.hex]
-        colors.extend(unique_colors)
-        colors.append(color_high.hex)
-
-        # fill color matrix
-        color_matrix = [['#808080' for _ in range(len(interval_dataframe))]]  # Class column, gray
-
-        # reversed colors for low=good and high=bad
-        colors_reversed = colors.copy()
-        colors_reversed.reverse()
-
-        # fill color matrix
-        for column in interval_dataframe.columns:
-            colors = colors_reversed if 'std' in column else colors
-            color_matrix.append([colors[value] for value in interval_dataframe[column]])
+        # buckets for coloring, std columns have their own bounds
+        breaks = get_bucket_breaks(*BUCKET_BOUNDS, MID_PERIODS)
+        std_breaks = get_bucket_breaks(*STD_BUCKET_BOUNDS, MID_PERIODS)
+
+        # colors, reversed colors for low=good and high=bad
+        colors = get_bucket_colors(MID_PERIODS)
+        colors_reversed = colors[::-1]
+
+        # fill color matrix, first column (Class) gray
+        color_matrix = [['#808080'] * len(self.dataframe)]
+        for column in self.dataframe.columns[1:]:
+            is_std = 'std' in column
+            indices = get_interval_indices_of_values(std_breaks if is_std else breaks,
+                                                     self.dataframe[column].to_numpy(dtype=float))
+            color_matrix.append((colors_reversed if is_std else colors)[indices].tolist())
 
         # round values, except first column (Class)
-        values = self.dataframe
-        values.iloc[:, 1:] = values.iloc[:, 1:].applymap(lambda x: round(x, self.precision))
+        values = self.dataframe.copy()
+        values.iloc[:, 1:] = values.iloc[:, 1:].round(self.precision)
+        self.dataframe = values
 
         # create figure
         fig = go.Figure(
@@ -1,14 +1,25 @@
+import numpy as np
+import pandas as pd
 import plotly.graph_objs as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 from .Plotter import Plotter
-from ..utils.utils_visualization import get_color_map
+from ..utils.utils_visualization import get_color_map, sample_values, gaussian_kde, DEFAULT_SAMPLING_METHOD
 
 
 class ViolinPlotter(Plotter):
     """Class for generating violin plots"""
 
-    def __init__(self, dataframe, result_path, file_name, title):
+    def __init__(self, dataframe, result_path, file_name, title, order=None, max_points=None,
+                 sampling=DEFAULT_SAMPLING_METHOD, kde=False, kde_points=100):
+        # order of the classes, e.g. the order of the bar plot
+        self.order = order
+        # maximum number of points per trace, sampled with the sampling method
+        self.max_points = max_points
+        self.sampling = sampling
+        # with kde, the densities are computed here and drawn as areas, no samples are embedded
+        self.kde = kde
+        self.kde_points = kde_points
         super().__init__(dataframe, result_path, file_name, title)
 
     def generate(self):
@@ -18,6 +29,13 @@ class ViolinPlotter(Plotter):
         for column in ['Class']:
             columns.remove(column)
 
+        # positions of the rows per class {class: positions}
+        positions_per_class = self.dataframe.groupby('Class', sort=False).indices
+        if self.order is not None:
+            classes = [clazz for clazz in self.order if clazz in positions_per_class]
+        else:
+            classes = list(pd.unique(self.dataframe['Class']))
+
         # create figure as subplots
         fig = make_subplots(
             rows=len(columns),
@@ -30,39 +48,84 @@ class ViolinPlotter(Plotter):
         colors = px.colors.qualitative.Plotly
 
         # map color to class
-        color_map = get_color_map(colors, self.dataframe['Class'])
+        color_map = get_color_map(colors, classes)
 
+        # one trace per class and column, placed on the x axis by its name
         for column_idx, column in enumerate(columns):
-            for clazz in self.dataframe['Class']:
+            values = self.dataframe[column].to_numpy()
+
+            if self.kde:
+                self.add_kde_traces(fig, column_idx + 1, values, classes, positions_per_class, color_map)
+                continue
 
+            for clazz in classes:
                 fig.add_trace(
                     go.Violin(
-                        x=self.dataframe['Class'][self.dataframe['Class'] == clazz],
-                        y=self.dataframe[column][self.dataframe['Class'] == clazz],
+                        y=sample_values(values[positions_per_class[clazz]], self.max_points, self.sampling),
                         name=clazz,
                         marker={'color': color_map[clazz],
                                 'symbol': 'x',
                                 'opacity': 0.3},
                         points='all',
-                        spanmode='soft'
+                        spanmode='soft',
+                        # legend entry only once per class
+                        showlegend=column_idx == 0
                     ),
                     row=column_idx + 1,
                     col=1
                 )
 
         # layout of all traces
-        fig.update_traces(box_visible=False, showlegend=True, meanline_visible=True)
+        fig.update_traces(box_visible=False, meanline_visible=True, selector=dict(type='violin'))
 
-        # hide duplicate labels
-        names = set()
-        fig.for_each_trace(
-            lambda trace:
-            trace.update(showlegend=False) if (trace.name in names) else names.add(trace.name))
-
-        # set specific layout
+        # set specific layout, width grows with the number of classes
         fig.update_layout(
             showlegend=False,
-            height=len(columns) * 200
+            height=len(columns) * 200,
+            width=max(len(classes) * 100, 700)
         )
 
         return fig
+
+    def add_kde_traces(self, fig, row, values, classes, positions_per_class, color_map, half_width=0.4):
+        """Adds the precomputed density of each class as area and its mean as line to the row of the figure."""
+        for class_idx, clazz in enumerate(classes):
+            class_values = values[positions_per_class[clazz]].astype(float)
+            grid, density = gaussian_kde(class_values, self.kde_points)
+            if len(grid) == 0:
+                continue
+            width = density / density.max() * half_width
+
+            fig.add_trace(
+                go.Scatter(
+                    x=np.concatenate([class_idx - width, (class_idx + width)[::-1]]),
+                    y=np.concatenate([grid, grid[::-1]]),
+                    name=clazz,
+                    mode='lines',
+                    fill='toself',
+                    line={'color': color_map[clazz], 'width': 1},
+                    hoverinfo='name',
+                    showlegend=row == 1
+                ),
+                row=row,
+                col=1
+            )
+
+            mean = np.nanmean(class_values)
+            mean_width = np.interp(mean, grid, width)
+            fig.add_trace(
+                go.Scatter(
+                    x=[class_idx - mean_width, class_idx + mean_width],
+                    y=[mean, mean],
+                    name=clazz,
+                    mode='lines',
+                    line={'color': color_map[clazz]},
+                    hovertemplate='mean: %{y:.4f}',
+                    showlegend=False
+                ),
+                row=row,
+                col=1
+            )
+
+        # classes as ticks of the numeric x axis
+        fig.update_xaxes(tickvals=list(range(len(classes))), ticktext=classes, row=row, col=1)
@@ -0,0 +1,64 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'config',
+                              'config.json')
+CLASSES = ['cat', 'dog', 'bird', 'avg']
+METRICS = ['precision', 'recall', 'f1']
+
+
+def write_model(model_path, number_of_runs, optimizer='Adam', seed=0):
+    """Writes a model directory with a config file and number_of_runs runs of random results."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(model_path, 'model'))
+    config = {"name": os.path.basename(model_path), "arch": {"type": "ResNet", "args": {"depth": 18}},
+              "dataset": {"args": {"root_dir": "data", "data_loader_config": {"args": {"batch_size": 8}},
+                                   "weight_config": "none"}},
+              "loss": {"type": "CrossEntropy"}, "optimizer": {"type": optimizer, "args": {"lr": 0.01}},
+              "trainer": {"epochs": 10}}
+    with open(os.path.join(model_path, 'model', 'config.json'), 'w') as config_file:
+        json.dump(config, config_file)
+
+    for run in range(1, number_of_runs + 1):
+        run_path = os.path.join(model_path, f'run{run}')
+        os.makedirs(os.path.join(run_path, 'results'))
+        for set_name in ['train', 'test']:
+            with open(os.path.join(run_path, 'results', f'{set_name}_testresults.csv'), 'w') as results_file:
+                results_file.write('Class,' + ','.join(METRICS) + '\n')
+                for class_name in CLASSES:
+                    results_file.write(class_name + ',' + ','.join(str(round(rng.random(), 6)) for _ in METRICS)
+                                       + '\n')
+    return model_path
+
+
+@pytest.fixture
+def session_path(tmp_path):
+    """Session with the models model0 (3 runs, Adam), model1 (4 runs, SGD) and model2 (5 runs, Adam)."""
+    path = os.path.join(tmp_path, 'session')
+    for idx in range(3):
+        write_model(os.path.join(path, f'model{idx}'), 3 + idx, ['Adam', 'SGD'][idx % 2], seed=idx)
+    return path
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Returns a function, which writes the default config with the given blocks updated and returns its path."""
+    def make(**blocks):
+        with open(DEFAULT_CONFIG) as config_file:
+            config = json.load(config_file)
+        for key, value in blocks.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+        path = os.path.join(tmp_path, 'config.json')
+        with open(path, 'w') as config_file:
+            json.dump(config, config_file)
+        return path
+    return make
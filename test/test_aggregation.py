@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.MetaReporter import MetaReporter
+from src.utils.utils_aggregation import aggregate, merge_aggregates, finalize_aggregate, check_streaming_metrics
+
+METRICS = ['count', 'sum', 'mean', 'var', 'std', 'min', 'max']
+
+
+def random_runs(number_of_runs, seed=0):
+    rng = np.random.default_rng(seed)
+    return [pd.DataFrame({'Class': ['cat', 'dog', 'bird'], 'f1': rng.random(3), 'loss': rng.normal(100, 5, 3)})
+            .set_index('Class') for _ in range(number_of_runs)]
+
+
+def calculate_at_once(runs):
+    aggregated = pd.concat(runs).groupby('Class', sort=False).agg(METRICS)
+    aggregated.columns = ['_'.join(column) for column in aggregated.columns]
+    return aggregated
+
+
+def test_merged_runs_equal_aggregation_at_once():
+    runs = random_runs(7)
+    state = None
+    for run in runs:
+        state = merge_aggregates(state, aggregate(run, 'Class'))
+    pd.testing.assert_frame_equal(finalize_aggregate(state, METRICS), calculate_at_once(runs), check_dtype=False)
+
+
+def test_merge_is_independent_of_the_grouping():
+    runs = random_runs(8, seed=1)
+    states = [aggregate(run, 'Class') for run in runs]
+    sequential = None
+    for state in states:
+        sequential = merge_aggregates(sequential, state)
+    tree = merge_aggregates(merge_aggregates(merge_aggregates(states[0], states[1]),
+                                             merge_aggregates(states[2], states[3])),
+                            merge_aggregates(merge_aggregates(states[4], states[5]),
+                                             merge_aggregates(states[6], states[7])))
+    pd.testing.assert_frame_equal(finalize_aggregate(tree, METRICS), finalize_aggregate(sequential, METRICS))
+
+
+def test_merge_with_missing_groups_and_columns():
+    first = pd.DataFrame({'Class': ['cat', 'dog'], 'f1': [0.5, 0.25]}).set_index('Class')
+    second = pd.DataFrame({'Class': ['dog', 'bird'], 'f1': [0.75, 1.0], 'loss': [2.0, 3.0]}).set_index('Class')
+    state = merge_aggregates(aggregate(first, 'Class'), aggregate(second, 'Class'))
+    result = finalize_aggregate(state, ['count', 'mean', 'min'])
+    assert list(result.index) == ['cat', 'dog', 'bird']
+    assert result.loc['dog', 'f1_mean'] == 0.5
+    assert result.loc['cat', 'loss_count'] == 0
+    assert np.isnan(result.loc['cat', 'loss_mean'])
+    assert result.loc['bird', 'loss_min'] == 3.0
+
+
+def test_merge_with_empty_state():
+    state = aggregate(random_runs(1)[0], 'Class')
+    assert merge_aggregates(None, state) is state
+    assert merge_aggregates(state, None) is state
+
+
+def test_check_streaming_metrics():
+    assert check_streaming_metrics(['mean', 'std'])
+    with pytest.raises(ValueError):
+        check_streaming_metrics(['median'])
+
+
+def test_streaming_without_sampled_runs_skips_run_plots(session_path, make_config):
+    config_path = make_config(streaming={'enabled': True, 'sampled_runs': 0},
+                              metrics={'model': ['mean', 'std', 'min', 'max'], 'session': ['mean', 'max']})
+    model_path = os.path.join(session_path, 'model0')
+    MetaReporter(model_path, model_path, config_path=config_path, level=0, plot_format='html')
+
+    files = os.listdir(model_path)
+    assert 'bar_meta_test_testresults.html' in files
+    assert not any(file.startswith('violin_') or file.startswith('table_') for file in files)
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tarfile
+
+import pandas as pd
+import pytest
+
+from src.BatchReporter import BatchReporter
+from src.MetaReporter import MetaReporter
+from src.utils.utils_config import ReporterConfig
+from src.utils.utils_files import get_archive
+from src.utils.utils_index import scan_session
+
+
+def make_archive(session_path, archive_format):
+    """Packs the session directory into an archive next to it, the archive contains the directory session."""
+    root = os.path.dirname(session_path)
+    base_name = os.path.join(root, 'archives', 'session')
+    return shutil.make_archive(base_name, archive_format, root_dir=root, base_dir='session')
+
+
+def read_result(path, file_name):
+    return pd.read_csv(os.path.join(path, file_name), index_col=0).sort_index()
+
+
+@pytest.mark.parametrize('archive_format', ['zip', 'gztar'])
+def test_archive_with_workers_equals_directory(session_path, make_config, tmp_path, archive_format):
+    archive_path = make_archive(session_path, archive_format)
+    config_path = make_config(workers=3)
+
+    MetaReporter(session_path, session_path, config_path=config_path, level=1)
+    result_path = os.path.join(tmp_path, 'archive_results')
+    os.makedirs(result_path)
+    MetaReporter(archive_path, result_path, config_path=config_path, level=1)
+
+    for file_name in ['meta_session.csv', 'collected_data.csv']:
+        pd.testing.assert_frame_equal(read_result(result_path, file_name), read_result(session_path, file_name))
+
+
+def test_compressed_tar_is_unpacked_once(session_path, make_config):
+    archive_path = make_archive(session_path, 'gztar')
+    scan_session(archive_path, ReporterConfig(make_config()))
+    archive = get_archive(archive_path)
+    with tarfile.open(archive_path) as tar:
+        expected = {name: tar.extractfile(name).read() for name in archive.names}
+
+    # backwards, the stream is decompressed once anyway
+    for name in reversed(archive.names):
+        with archive.open(name) as member:
+            assert member.read() == expected[name]
+    assert archive.compressed and set(archive.unpacked.keys()) == set(archive.names)
+
+
+def test_compressed_tar_skips_other_members(session_path, make_config):
+    checkpoint_size = 4 * 1024 * 1024
+    with open(os.path.join(session_path, 'model0', 'run1', 'checkpoint.pth'), 'wb') as checkpoint_file:
+        checkpoint_file.write(os.urandom(checkpoint_size))
+    archive_path = make_archive(session_path, 'gztar')
+    session_index = scan_session(archive_path, ReporterConfig(make_config()))
+    archive = get_archive(archive_path)
+
+    model_index = next(iter(session_index.values()))
+    with archive.open(model_index.get_files_of_runs()[0].split('!/')[1]) as member:
+        member.read()
+
+    # only the indexed members are unpacked, the checkpoint is never copied
+    checkpoint_name = 'session/model0/run1/checkpoint.pth'
+    assert checkpoint_name in archive.sizes and checkpoint_name not in archive.unpacked
+    archive.unpacked_file.seek(0, os.SEEK_END)
+    assert archive.unpacked_file.tell() == sum(archive.sizes[name] for name in archive.unpacked)
+    assert archive.unpacked_file.tell() < checkpoint_size
+
+
+def test_batch_of_archive(session_path, make_config, tmp_path):
+    archive_path = make_archive(session_path, 'zip')
+    result_path = os.path.join(tmp_path, 'results')
+    os.makedirs(result_path)
+    reporter = BatchReporter([archive_path], [result_path], config_path=make_config(), workers=2,
+                             queue_path=os.path.join(tmp_path, 'queue'))
+    result = reporter.run()
+    assert result['failed'] == {}
+
+    # the meta files are written into the result path, the summary is built from them
+    assert os.path.exists(os.path.join(result_path, 'model0', 'meta_test_testresults.csv'))
+    MetaReporter(session_path, session_path, config_path=make_config(), level=1)
+    pd.testing.assert_frame_equal(read_result(result_path, 'meta_session.csv'),
+                                  read_result(session_path, 'meta_session.csv'))
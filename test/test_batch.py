@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from src.BatchReporter import BatchReporter, AGGREGATE, COLLECT, PLOTS, SUMMARY
+from src.utils.utils_queue import JobQueue, DONE, FAILED, LOCKED, PENDING
+
+
+def test_claim_is_exclusive(tmp_path):
+    queue = JobQueue(os.path.join(tmp_path, 'queue'))
+    queue.add({'id': 'job'})
+    assert queue.claim('job')
+    assert not queue.claim('job')
+    assert queue.get_state('job') == LOCKED
+
+    queue.complete('job')
+    assert queue.get_state('job') == DONE
+    assert not queue.claim('job')
+
+
+def test_abandoned_lock_is_taken_over(tmp_path):
+    queue = JobQueue(os.path.join(tmp_path, 'queue'), lock_timeout=60)
+    queue.add({'id': 'job'})
+    assert queue.claim('job')
+    old = time.time() - 120
+    os.utime(queue.get_file('job', 'lock'), (old, old))
+
+    assert queue.get_state('job') == PENDING
+    assert queue.claim('job')
+    assert queue.get_state('job') == LOCKED
+    assert not any(file_name.endswith('.stale') for file_name in os.listdir(queue.directory))
+
+
+def test_fresh_lock_is_not_taken_over(tmp_path):
+    # e.g. another host took over the abandoned lock after it was checked
+    queue = JobQueue(os.path.join(tmp_path, 'queue'), lock_timeout=60)
+    queue.add({'id': 'job'})
+    assert queue.claim('job')
+    with open(queue.get_file('job', 'lock')) as lock_file:
+        lock = json.load(lock_file)
+
+    assert not queue.take_over('job')
+    with open(queue.get_file('job', 'lock')) as lock_file:
+        assert json.load(lock_file) == lock
+    assert not queue.claim('job')
+
+
+def failed_future():
+    future = Future()
+    future.set_exception(RuntimeError('job failed'))
+    return future
+
+
+def test_failed_job_is_retried(session_path, make_config, tmp_path):
+    reporter = BatchReporter([session_path], config_path=make_config(), retries=1,
+                             queue_path=os.path.join(tmp_path, 'queue'))
+    job_id = next(job_id for job_id, job in reporter.jobs.items() if job['kind'] == SUMMARY)
+    reporter.queue.add(reporter.jobs[job_id])
+
+    assert reporter.queue.claim(job_id)
+    assert not reporter.finish_job(job_id, failed_future())
+    assert reporter.queue.get_state(job_id) == PENDING
+    assert reporter.queue.get(job_id)['attempts'] == 1
+
+    assert reporter.queue.claim(job_id)
+    assert not reporter.finish_job(job_id, failed_future())
+    assert reporter.queue.get_state(job_id) == FAILED
+    assert 'job failed' in reporter.queue.get_error(job_id)
+
+
+def test_batch_with_plots(session_path, make_config, tmp_path):
+    result_path = os.path.join(tmp_path, 'results')
+    os.makedirs(result_path)
+    reporter = BatchReporter([session_path], [result_path], config_path=make_config(plot_format='html'), plots=True,
+                             workers=2, queue_path=os.path.join(tmp_path, 'queue'))
+    result = reporter.run()
+    assert result['failed'] == {}
+    assert len(result['done']) == len(reporter.jobs)
+
+    assert os.path.exists(os.path.join(result_path, 'meta_session.csv'))
+    assert os.path.exists(os.path.join(session_path, 'model0', 'meta_test_testresults.csv'))
+    # the plots are written into the directory of the model in the result path
+    plot_jobs = [job for job in reporter.jobs.values() if job['kind'] == PLOTS]
+    assert len(plot_jobs) == 3
+    for job in plot_jobs:
+        files = os.listdir(os.path.join(result_path, os.path.basename(job['model'])))
+        assert 'bar_meta_test_testresults.html' in files
+        assert 'violin_test_testresults.html' in files
+
+
+def test_later_batch_picks_up_new_run(session_path, make_config, tmp_path):
+    queue_path = os.path.join(tmp_path, 'queue')
+    first = BatchReporter([session_path], config_path=make_config(), workers=2, queue_path=queue_path)
+    assert first.run()['failed'] == {}
+
+    shutil.copytree(os.path.join(session_path, 'model0', 'run1'), os.path.join(session_path, 'model0', 'run4'))
+    second = BatchReporter([session_path], config_path=make_config(), workers=2, queue_path=queue_path)
+    # only the jobs of the changed model and of the session are new
+    new_jobs = set(second.jobs.keys()) - set(first.jobs.keys())
+    assert {second.jobs[job_id]['kind'] for job_id in new_jobs} == {COLLECT, AGGREGATE, SUMMARY}
+    assert [second.jobs[job_id]['model'] for job_id in new_jobs if second.jobs[job_id]['kind'] == AGGREGATE] == \
+        [os.path.join(session_path, 'model0')]
+
+    result = second.run()
+    assert result['failed'] == {}
+    summary = pd.read_csv(os.path.join(session_path, 'meta_session.csv'), index_col='model')
+    assert summary.loc['model0', 'runs'] == 4
+    assert summary.loc['model1', 'runs'] == 4
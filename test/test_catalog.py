@@ -0,0 +1,66 @@
+import os
+import shutil
+
+from src.MetaReporter import MetaReporter
+from src.utils.utils_catalog import ResultsCatalog
+
+
+def generate(session_path, make_config, catalog_path):
+    MetaReporter(session_path, session_path, config_path=make_config(catalog={'enabled': True, 'path': catalog_path}),
+                 level=1)
+    return ResultsCatalog(catalog_path)
+
+
+def test_session_is_upserted(session_path, make_config, tmp_path):
+    catalog_path = os.path.join(tmp_path, 'catalog.sqlite')
+    catalog = generate(session_path, make_config, catalog_path)
+    counts = catalog.query("SELECT (SELECT COUNT(*) FROM models) AS models, (SELECT COUNT(*) FROM run_values) AS "
+                           "run_values")
+    # written again, the rows are replaced
+    catalog = generate(session_path, make_config, catalog_path)
+    assert catalog.query("SELECT (SELECT COUNT(*) FROM models) AS models, (SELECT COUNT(*) FROM run_values) AS "
+                         "run_values").equals(counts)
+    assert counts.loc[0, 'models'] == 3
+    # 12 runs with two sets of four classes and three metrics
+    assert counts.loc[0, 'run_values'] == 12 * 2 * 4 * 3
+
+    models = catalog.get_models(filters={'optimizer_type': 'SGD'})
+    assert list(models['model']) == ['model1']
+    assert models.loc[0, 'session_name'] == 'session'
+
+
+def test_top_k(session_path, make_config, tmp_path):
+    catalog = generate(session_path, make_config, os.path.join(tmp_path, 'catalog.sqlite'))
+    values = catalog.query("SELECT model, AVG(value) AS value FROM summary WHERE set_name = 'test' AND metric = 'f1' "
+                           "AND statistic = 'max' GROUP BY model ORDER BY value DESC")
+
+    best = catalog.top_k('test', 'f1', 'max', k=2)
+    assert list(best['model']) == list(values['model'][:2])
+    assert list(best['rank']) == [1, 2]
+
+    per_optimizer = catalog.top_k('test', 'f1', 'max', k=1, group_by='optimizer_type')
+    assert sorted(per_optimizer['optimizer_type']) == ['Adam', 'SGD']
+    adam = per_optimizer.set_index('optimizer_type').loc['Adam', 'model']
+    assert adam == values[values['model'].isin(['model0', 'model2'])]['model'].iloc[0]
+
+
+def test_compare(session_path, make_config, tmp_path):
+    catalog = generate(session_path, make_config, os.path.join(tmp_path, 'catalog.sqlite'))
+    compared = catalog.compare([(session_path, 'model0'), (session_path, 'model1')], 'test', 'f1')
+    assert list(compared.columns) == [os.path.join(session_path, 'model0'), os.path.join(session_path, 'model1')]
+    # avg is dropped by the default config
+    assert sorted(compared.index) == ['bird', 'cat', 'dog']
+    assert len(catalog.compare([], 'test', 'f1')) == 0
+
+
+def test_sessions_with_the_same_name(session_path, make_config, tmp_path):
+    catalog_path = os.path.join(tmp_path, 'catalog.sqlite')
+    other_path = os.path.join(tmp_path, 'other', 'session')
+    shutil.copytree(session_path, other_path)
+    generate(session_path, make_config, catalog_path)
+    catalog = generate(other_path, make_config, catalog_path)
+
+    models = catalog.get_models()
+    assert len(models) == 6
+    assert sorted(set(models['session'])) == sorted([os.path.abspath(session_path), os.path.abspath(other_path)])
+    assert set(models['session_name']) == {'session'}
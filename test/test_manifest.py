@@ -0,0 +1,50 @@
+import json
+import os
+
+from src.MetaReporter import MetaReporter
+from src.utils.utils_index import scan_model
+
+
+def generate(reporter, model_path):
+    return reporter.generate_per_model(model_path, generate_plots=False, model_index=scan_model(model_path,
+                                                                                                reporter.config))
+
+
+def test_unchanged_model_is_skipped(session_path, make_config):
+    model_path = os.path.join(session_path, 'model0')
+    reporter = MetaReporter(session_path, session_path, config_path=make_config(), level=None, incremental=True)
+    assert generate(reporter, model_path) is not None
+    assert generate(reporter, model_path) is None
+
+
+def test_changed_run_file_invalidates_model(session_path, make_config):
+    model_path = os.path.join(session_path, 'model0')
+    reporter = MetaReporter(session_path, session_path, config_path=make_config(), level=None, incremental=True)
+    generate(reporter, model_path)
+
+    with open(os.path.join(model_path, 'run1', 'results', 'test_testresults.csv'), 'a') as results_file:
+        results_file.write('fish,0.1,0.2,0.3\n')
+    assert generate(reporter, model_path) is not None
+
+
+def test_changed_config_file_invalidates_model(session_path, make_config):
+    model_path = os.path.join(session_path, 'model0')
+    reporter = MetaReporter(session_path, session_path, config_path=make_config(), level=None, incremental=True)
+    generate(reporter, model_path)
+
+    config_path = os.path.join(model_path, 'model', 'config.json')
+    with open(config_path) as config_file:
+        config = json.load(config_file)
+    config['trainer']['epochs'] = 20
+    with open(config_path, 'w') as config_file:
+        json.dump(config, config_file)
+    assert generate(reporter, model_path) is not None
+
+
+def test_removed_output_invalidates_model(session_path, make_config):
+    model_path = os.path.join(session_path, 'model0')
+    reporter = MetaReporter(session_path, session_path, config_path=make_config(), level=None, incremental=True)
+    generate(reporter, model_path)
+
+    os.remove(os.path.join(model_path, 'meta_test_testresults.csv'))
+    assert generate(reporter, model_path) is not None
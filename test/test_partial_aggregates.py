@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+
+from src.MetaReporter import MetaReporter
+
+STREAMING = {'metrics': {'model': ['mean', 'std', 'min', 'max'], 'session': ['mean', 'max']},
+             'partial_aggregates': {'enabled': True}}
+
+
+def generate_shard(model_path, result_path, config_path, runs=None):
+    os.makedirs(result_path, exist_ok=True)
+    reporter = MetaReporter(model_path, result_path, config_path=config_path, level=None, runs=runs)
+    return reporter.generate_per_model(generate_plots=False)
+
+
+def assert_merged_equal(merged, full):
+    assert merged.keys() == full.keys()
+    for file_name in full.keys():
+        pd.testing.assert_frame_equal(merged[file_name], full[file_name], check_dtype=False, check_exact=False,
+                                      rtol=1e-12, atol=0.0)
+
+
+def test_merged_shards_equal_single_run(session_path, make_config, tmp_path):
+    config_path = make_config(**STREAMING)
+    model_path = os.path.join(session_path, 'model2')
+    full = generate_shard(model_path, os.path.join(tmp_path, 'full'), config_path)
+
+    shards = [['run1', 'run2'], ['run3'], ['run4', 'run5']]
+    directories = [os.path.join(tmp_path, f'node{idx}') for idx in range(len(shards))]
+    for directory, runs in zip(directories, shards):
+        generate_shard(model_path, directory, config_path, runs)
+
+    merger = MetaReporter(model_path, os.path.join(tmp_path, 'merged'), config_path=config_path, level=None)
+    os.makedirs(merger.result_path)
+    assert_merged_equal(merger.merge_partial_aggregates(directories), full)
+
+
+def test_partials_of_other_formats_are_ignored(session_path, make_config, tmp_path):
+    model_path = os.path.join(session_path, 'model1')
+    full = generate_shard(model_path, os.path.join(tmp_path, 'full'), make_config(**STREAMING))
+
+    directories = [os.path.join(tmp_path, 'node0'), os.path.join(tmp_path, 'node1')]
+    for directory, runs in zip(directories, [['run1', 'run2'], ['run3', 'run4']]):
+        # partial files of an earlier run with another output format stay in the directory
+        generate_shard(model_path, directory, make_config(output={'format': 'parquet'}, **STREAMING), runs)
+        generate_shard(model_path, directory, make_config(**STREAMING), runs)
+    assert any(file_name.endswith('.parquet') for file_name in os.listdir(directories[0]))
+
+    merger = MetaReporter(model_path, os.path.join(tmp_path, 'merged'), config_path=make_config(**STREAMING),
+                          level=None)
+    os.makedirs(merger.result_path)
+    assert_merged_equal(merger.merge_partial_aggregates(directories), full)
@@ -0,0 +1,105 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from src.MetaReporter import MetaReporter
+from src.SessionWatcher import SessionWatcher
+from src.utils.utils_prefetch import Prefetcher
+
+
+class RecordingCache:
+    """Parent cache which records the order of the reads, reads block until release is set."""
+
+    def __init__(self):
+        self.reads = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.release.set()
+
+    def read(self, path):
+        self.release.wait()
+        with self.lock:
+            self.reads.append(path)
+        return path.upper(), path
+
+
+def test_files_are_read_in_prefetch_order():
+    parent = RecordingCache()
+    with Prefetcher(parent, workers=1, depth=2) as prefetcher:
+        prefetcher.prefetch(list('abcd'))
+        assert [prefetcher.read(path)[0] for path in 'abcd'] == list('ABCD')
+    assert parent.reads == list('abcd')
+
+
+def test_depth_bounds_the_pipeline():
+    parent = RecordingCache()
+    parent.release.clear()
+    with Prefetcher(parent, workers=2, depth=3) as prefetcher:
+        prefetcher.prefetch(list('abcdef'))
+        assert [path for path, _ in prefetcher.submitted] == list('abc')
+        assert list(prefetcher.queued) == list('def')
+        parent.release.set()
+        prefetcher.read('a')
+        assert [path for path, _ in prefetcher.submitted] == list('bcd')
+
+
+def test_out_of_order_read_keeps_the_other_files():
+    parent = RecordingCache()
+    with Prefetcher(parent, workers=2, depth=2) as prefetcher:
+        prefetcher.prefetch(list('abcde'))
+        # d is queued, c is submitted
+        assert prefetcher.read('d')[0] == 'D'
+        assert prefetcher.read('c')[0] == 'C'
+        assert prefetcher.pending == {'a', 'b', 'e'}
+        assert [prefetcher.read(path)[0] for path in 'abe'] == list('ABE')
+        assert prefetcher.pending == set()
+        # not prefetched, read directly
+        assert prefetcher.read('x')[0] == 'X'
+    assert sorted(parent.reads) == list('abcdex')
+    assert len(parent.reads) == 6
+
+
+def test_discarded_files_free_their_place():
+    parent = RecordingCache()
+    with Prefetcher(parent, workers=1, depth=2) as prefetcher:
+        prefetcher.prefetch(list('abcd'))
+        prefetcher.discard(['a', 'b'])
+        assert [path for path, _ in prefetcher.submitted] == list('cd')
+        assert prefetcher.read('c')[0] == 'C'
+
+
+def test_close_stops_the_threads():
+    prefetcher = Prefetcher(RecordingCache(), workers=2, depth=2)
+    prefetcher.prefetch(list('abc'))
+    assert prefetcher.executor is not None
+    prefetcher.close()
+    assert prefetcher.executor is None
+    assert prefetcher.pending == set()
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Prefetcher(depth=0)
+
+
+def test_session_with_prefetching_equals_without(session_path, make_config, tmp_path):
+    result_path = os.path.join(tmp_path, 'prefetched')
+    os.makedirs(result_path)
+    reporter = MetaReporter(session_path, result_path, config_path=make_config(prefetch={'enabled': True, 'depth': 2}),
+                            level=1)
+    assert reporter.prefetcher.executor is None
+    MetaReporter(session_path, session_path, config_path=make_config(), level=1)
+
+    for file_name in ['meta_session.csv', 'collected_data.csv']:
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(result_path, file_name)),
+                                      pd.read_csv(os.path.join(session_path, file_name)))
+
+
+def test_watcher_reads_without_prefetcher(session_path, make_config):
+    watcher = SessionWatcher(session_path, session_path, config_path=make_config(prefetch={'enabled': True}),
+                             debounce=0.0)
+    assert watcher.reporter.prefetcher is None
+    assert watcher.reporter.get_reader() is watcher.reporter.csv_cache
+    assert not isinstance(watcher.reporter.csv_cache.parent, Prefetcher)
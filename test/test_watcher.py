@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+
+from src.SessionWatcher import SessionWatcher
+from conftest import write_model
+
+
+def test_models_are_updated_after_debounce(session_path, make_config):
+    watcher = SessionWatcher(session_path, session_path, config_path=make_config(), debounce=5.0)
+    assert watcher.poll(now=0.0) == []
+    assert len(watcher.pending) == 3
+    assert not os.path.exists(os.path.join(session_path, 'meta_session.csv'))
+
+    assert sorted(os.path.basename(path) for path in watcher.poll(now=5.0)) == ['model0', 'model1', 'model2']
+    assert len(pd.read_csv(os.path.join(session_path, 'meta_session.csv'))) == 3
+    assert os.path.exists(os.path.join(session_path, 'collected_data.csv'))
+    assert not watcher.collection_outdated
+
+
+def test_only_changed_models_are_updated(session_path, make_config):
+    watcher = SessionWatcher(session_path, session_path, config_path=make_config(), debounce=5.0)
+    watcher.poll(now=0.0)
+    watcher.poll(now=5.0)
+    assert watcher.poll(now=6.0) == []
+
+    with open(os.path.join(session_path, 'model1', 'run1', 'results', 'test_testresults.csv'), 'a') as results_file:
+        results_file.write('fish,0.1,0.2,0.3\n')
+    # still written, not updated until the files did not change for debounce seconds
+    assert watcher.poll(now=7.0) == []
+    assert watcher.poll(now=12.0) == [os.path.join(session_path, 'model1')]
+    meta = pd.read_csv(os.path.join(session_path, 'model1', 'meta_test_testresults.csv'), index_col=0)
+    assert 'fish' in meta.index
+
+
+def test_new_model_is_added(session_path, make_config):
+    watcher = SessionWatcher(session_path, session_path, config_path=make_config(), debounce=0.0)
+    watcher.poll(now=0.0)
+    write_model(os.path.join(session_path, 'model3'), 2)
+    assert watcher.poll(now=1.0) == [os.path.join(session_path, 'model3')]
+    assert len(pd.read_csv(os.path.join(session_path, 'meta_session.csv'))) == 4